@@ -18,6 +18,14 @@ import re
 import sys
 
 
+# note: this implementation uses a weak heuristic: only the closing } of a
+# given function has no indentation
+SAFE_HEAP_FUNCTION_PATTERNS = [
+    re.compile("function %s\([^\)]*\)\s*{(.*\n)+?}" % func)
+    for func in ["SAFE_HEAP_LOAD", "SAFE_HEAP_LOAD_D", "SAFE_HEAP_STORE", "SAFE_HEAP_STORE_D"]
+]
+
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('js_file')
@@ -29,10 +37,8 @@ def main():
         source = f.read()
 
     # remove all known functions for memory access
-    # note: this implementation uses a weak heuristic: only the closing } of a
-    # given function has no indentation
-    for func in ["SAFE_HEAP_LOAD", "SAFE_HEAP_LOAD_D", "SAFE_HEAP_STORE", "SAFE_HEAP_STORE_D"]:
-        source = re.sub("function %s\([^\)]*\)\s*{(.*\n)+?}" % func, "", source)
+    for pattern in SAFE_HEAP_FUNCTION_PATTERNS:
+        source = pattern.sub("", source)
 
     # applies the same patch as seen at
     # https://github.com/kripken/emscripten/commit/bc11547fbf446993ee0f6f30a0deb3f80f205c35
@@ -1,4 +1,6 @@
 from __future__ import absolute_import, print_function
+import mmap
+
 from pebble_tool.commands.base import PebbleCommand
 
 from progressbar import ProgressBar, Bar, FileTransferSpeed, Timer, Percentage
@@ -16,18 +18,23 @@ class InstallLangCcommand(PebbleCommand):
         progress_bar = ProgressBar(widgets=[Percentage(), Bar(marker='=', left='[', right=']'),
                                             ' ', FileTransferSpeed(), ' ', Timer(format='%s')])
 
+        # Map the language pack rather than reading it into memory; PutBytes only ever slices
+        # out one chunk of it at a time
         with open(args.lang_file, 'rb') as f:
-            lang_pack = f.read()
+            lang_pack = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
 
-        progress_bar.maxval = len(lang_pack)
-        progress_bar.start()
+        try:
+            progress_bar.maxval = len(lang_pack)
+            progress_bar.start()
 
-        def _handle_progress(sent, total_sent, total_length):
-            progress_bar.update(total_sent)
+            def _handle_progress(sent, total_sent, total_length):
+                progress_bar.update(total_sent)
 
-        pb = PutBytes(self.pebble, PutBytesType.File, lang_pack, bank=0, filename="lang")
-        pb.register_handler("progress", _handle_progress)
-        pb.send()
+            pb = PutBytes(self.pebble, PutBytesType.File, lang_pack, bank=0, filename="lang")
+            pb.register_handler("progress", _handle_progress)
+            pb.send()
+        finally:
+            lang_pack.close()
 
         progress_bar.finish()
 
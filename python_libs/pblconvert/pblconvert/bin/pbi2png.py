@@ -24,6 +24,9 @@ class pbi_struct(Structure):
 def flip_byte(abyte):
     return int('{:08b}'.format(abyte)[::-1],2)
 
+# translate table mapping every byte to its bit-reversed value
+FLIP_BYTE_LUT = bytes(bytearray(flip_byte(abyte) for abyte in range(256)))
+
 #converts from argb8 (2-bits per color channel) to RGBA32 (byte per channel)
 def argb8_to_rgba32(argb8):
     return (
@@ -32,6 +35,13 @@ def argb8_to_rgba32(argb8):
         ((argb8     ) & 0x3) * 85,  #B
         ((argb8 >> 6) & 0x3) * 85)  #A
 
+# argb8_to_rgba32 for every argb8 value, as packed RGBA bytes
+ARGB8_TO_RGBA32_LUT = [bytes(bytearray(argb8_to_rgba32(argb8))) for argb8 in range(256)]
+
+# per-channel translate tables for argb8_to_rgba32, in R, G, B, A order
+ARGB8_TO_RGBA32_LUTS = [bytes(bytearray(rgba32[channel] for rgba32 in ARGB8_TO_RGBA32_LUT))
+                        for channel in range(4)]
+
 
 def pbi_format(info):
     return (info & 0xe) >> 1
@@ -56,61 +66,59 @@ def pbi_to_png(pbi, pixel_bytearray):
     # if version is 2 and format is 0x01 (GBitmapFormat8Bit)
     if gbitmap_version == 1 and gbitmap_format == format_dict['GBitmapFormat8Bit']:
         print("8-bit ARGB color image")
-        pixel_rgba_array = bytearray()
-        for (idx, abyte) in enumerate(pixel_bytearray):
-            argb8 = pixel_bytearray[idx]
-            pixel_rgba_array.append(((argb8 >> 4) & 0x3) * 85)  # r
-            pixel_rgba_array.append(((argb8 >> 2) & 0x3) * 85)  # g
-            pixel_rgba_array.append(((argb8 >> 0) & 0x3) * 85)  # b
-            pixel_rgba_array.append(((argb8 >> 6) & 0x3) * 85)  # a
+        # expand each channel with one translate pass, interleaving the results as R, G, B, A
+        pixel_rgba_array = bytearray(len(pixel_bytearray) * 4)
+        for channel, lut in enumerate(ARGB8_TO_RGBA32_LUTS):
+            pixel_rgba_array[channel::4] = pixel_bytearray.translate(lut)
 
         png = Image.frombuffer('RGBA', (pbi.bounds_w, pbi.bounds_h),
-                               buffer(pixel_rgba_array), 'raw', 'RGBA', pbi.stride * 4, 1)
+                               memoryview(pixel_rgba_array), 'raw', 'RGBA', pbi.stride * 4, 1)
 
     elif gbitmap_version == 1 and pbi_is_palettized(gbitmap_format):
         bitdepth = pbi_bitdepth(gbitmap_format)
         print("{}-bit palettized color image".format(bitdepth))
 
         # Create palette colors in format R, G, B, A
-        palette = []
         palette_offset = pbi.stride * pbi.bounds_h
-        for argb8 in pixel_bytearray[palette_offset:]:
-            palette.append((argb8_to_rgba32(argb8)))
-
-        pixels = []
-        # go through the image data byte by byte, and handle
-        # converting the depth-packed indexes for the palette to an unpacked list
-        idx = 0  # index of actual packed values including padded values
-        for pxl8 in pixel_bytearray[:palette_offset]:
-            for i in xrange(0, 8 / bitdepth):
-                # only append actual pixels, ignoring padding pixels
-                # which is the difference between the width and the stride
-                if (idx % (pbi.stride * (8 / bitdepth)) < pbi.bounds_w):
-                    pixels.append(
-                        ((pxl8 >> (bitdepth * (8 / bitdepth - (i + 1)))) & ~(~0 << bitdepth)))
-                idx = idx + 1
+        palette = [ARGB8_TO_RGBA32_LUT[argb8] for argb8 in pixel_bytearray[palette_offset:]]
 
         # Manually convert from paletted to RGBA
-        # as PIL doesn't seem to handle palette with alpha
-        rgba_pixels = []
-        for pal_pxl in pixels:
-            rgba_pixels.append(palette[pal_pxl])
+        # as PIL doesn't seem to handle palette with alpha:
+        # map each packed byte value that occurs in the image to the RGBA
+        # colors of all of the depth-packed palette indexes it holds
+        pixels_per_byte = 8 // bitdepth
+        image_bytearray = pixel_bytearray[:palette_offset]
+        # (row padding can hold indexes past the end of a short palette, so those map to
+        # transparent black; they're trimmed from each row below anyway)
+        byte_to_rgba = {}
+        for pxl8 in set(image_bytearray):
+            indexes = [(pxl8 >> (bitdepth * (pixels_per_byte - (i + 1)))) & ~(~0 << bitdepth)
+                       for i in range(0, pixels_per_byte)]
+            byte_to_rgba[pxl8] = b''.join(palette[idx] if idx < len(palette) else b'\0\0\0\0'
+                                          for idx in indexes)
+
+        # go through the image data row by row, only keeping actual pixels, ignoring
+        # padding pixels which is the difference between the width and the stride
+        row_size = pbi.bounds_w * 4
+        rgba_pixels = bytearray()
+        for row in range(0, pbi.bounds_h):
+            row_bytearray = image_bytearray[row * pbi.stride:(row + 1) * pbi.stride]
+            rgba_pixels += b''.join([byte_to_rgba[pxl8] for pxl8 in row_bytearray])[:row_size]
 
-        png = Image.new('RGBA', (pbi.bounds_w, pbi.bounds_h))
-        png.putdata(rgba_pixels)
+        png = Image.frombuffer('RGBA', (pbi.bounds_w, pbi.bounds_h),
+                               memoryview(rgba_pixels), 'raw', 'RGBA', row_size, 1)
 
     # legacy 1-bit format
     elif gbitmap_version == 0 or \
             (gbitmap_version == 1 and gbitmap_format == format_dict['GBitmapFormat1Bit']):
         print("1-bit b&w image")
         # pbi has bits in bytes reversed, so flip here
-        for (idx, abyte) in enumerate(pixel_bytearray):
-            pixel_bytearray[idx] = flip_byte(pixel_bytearray[idx])
+        pixel_bytearray[:] = pixel_bytearray.translate(FLIP_BYTE_LUT)
 
         png = Image.frombuffer('1', (pbi.bounds_w, pbi.bounds_h),
-                               buffer(pixel_bytearray), 'raw', '1', pbi.stride, 1)
+                               bytes(pixel_bytearray), 'raw', '1', pbi.stride, 1)
     else:
-        print "Bad PBI"
+        print("Bad PBI")
         png = None
 
     return png
@@ -13,13 +13,20 @@ from svg2pdc.exceptions import Svg2PdcFormatError
 class Handler:
     __metaclass__ = ABCMeta
 
+    # handler classes by the format they read, filled in by Handler.register()
+    _handlers = {}
+
+    @classmethod
+    def register(cls, subclass):
+        if cls is Handler:
+            cls._handlers[subclass.format()] = subclass
+        return ABCMeta.register(cls, subclass)
+
     @classmethod
     def handler_for_format(cls, fmt):
         if cls is Handler:
-            for C in cls.__subclasses__():
-                if fmt == C.format():
-                    return C()
-            return None
+            C = cls._handlers.get(fmt)
+            return C() if C is not None else None
         raise NotImplementedError
 
     @abstractmethod
@@ -1,8 +1,8 @@
-from StringIO import StringIO
 import os
+import platform
 import shutil
 import tempfile
-from struct import pack
+from struct import pack, Struct
 import sys
 from subprocess import Popen, PIPE
 from pebble_image_routines import truncate_color_to_pebble64_palette, nearest_color_to_pebble64_palette, \
@@ -15,16 +15,19 @@ DRAW_COMMAND_TYPE_PRECISE_PATH = 3
 
 epsilon = sys.float_info.epsilon
 
+# compiled point array layouts for serialize_points, keyed by number of points
+_point_array_structs = {}
+
 def valid_color(r, g, b, a):
-    return  (r <= 0xFF) and (g <= 0xFF) and (b <= 0xFF) and (a <= 0xFF) and \
-            (r >= 0x00) and (g >= 0x00) and (b >= 0x00) and (a >= 0x00)
+    # any channel outside 0x00-0xFF (including a negative one) sets a bit above the low byte
+    return ((r | g | b | a) & ~0xFF) == 0
 
 
 def convert_color(r, g, b, a, truncate=True):
 
     valid = valid_color(r, g, b, a)
     if not valid:
-        print "Invalid color: ({}, {}, {}, {})".format(r, g, b, a)
+        print("Invalid color: ({}, {}, {}, {})".format(r, g, b, a))
         return 0
 
     if truncate:
@@ -34,49 +37,42 @@ def convert_color(r, g, b, a, truncate=True):
 
     return rgba32_triplet_to_argb8(r, g, b, a)
 
-def sum_points(p1, p2):
-    return p1[0] + p2[0], p1[1] + p2[1]
-
-
 def subtract_points(p1, p2):
     return p1[0] - p2[0], p1[1] - p2[1]
 
 
-def round_point(p):
-    return round(p[0] + epsilon), round(p[1] + epsilon)  # hack to get around the fact that python rounds negative
-                                                         # numbers downwards
-
-
 def scale_point(p, factor):
     return p[0] * factor, p[1] * factor
 
 
-def find_nearest_valid_point(p):
-    return (round(p[0] * 2.0) / 2.0), (round(p[1] * 2.0) / 2.0)
-
-
-def find_nearest_valid_precise_point(p):
-    return (round(p[0] * 8.0) / 8.0), (round(p[1] * 8.0) / 8.0)
+def convert_to_pebble_coordinates(point, precise=False):
+    converted, problems = convert_points_to_pebble_coordinates([point], precise)
+    return converted[0], (problems[0][1] if problems else None)
 
 
-def convert_to_pebble_coordinates(point, precise=False):
+def convert_points_to_pebble_coordinates(points, precise=False):
     # convert from graphic tool coordinate system to pebble coordinate system so that they render the same on
     # both
+    # returns the converted points, and (point, problem) pairs for the points that are not on the supported grid
 
-    if not precise:
-        nearest = find_nearest_valid_point(point)  # used to give feedback to user if the point shifts considerably
-    else:
-        nearest = find_nearest_valid_precise_point(point)
+    grid = 8.0 if precise else 2.0
+    scale = 8 if precise else 1  # scale point for precise coordinates
+    converted = []
+    problems = []
+    for point in points:
+        x, y = point[0], point[1]
 
-    problem = None if compare_points(point, nearest) else "Invalid point: ({:.2f}, {:.2f}). Used closest supported coordinate: ({}, {})".format(
-        point[0], point[1], nearest[0], nearest[1])
+        nearest_x = round(x * grid) / grid  # used to give feedback to user if the point shifts considerably
+        nearest_y = round(y * grid) / grid
+        if x != nearest_x or y != nearest_y:
+            problems.append((point, "Invalid point: ({:.2f}, {:.2f}). Used closest supported coordinate: ({}, {})".format(
+                x, y, nearest_x, nearest_y)))
 
-    translated = sum_points(point, (-0.5, -0.5))   # translate point by (-0.5, -0.5)
-    if precise:
-        translated = scale_point(translated, 8)  # scale point for precise coordinates
-    rounded = round_point(translated)
+        # translate point by (-0.5, -0.5); epsilon is a hack to get around the fact that python rounds
+        # negative numbers downwards
+        converted.append((round((x + -0.5) * scale + epsilon), round((y + -0.5) * scale + epsilon)))
 
-    return rounded, problem
+    return converted, problems
 
 
 def compare_points(p1, p2):
@@ -88,10 +84,13 @@ class InvalidPointException(Exception):
 
 
 def bounding_box_around_points(points):
-    result = None
-    for p in points:
-        result = extend_bounding_box(result, p)
-    return result
+    xs = [p[0] for p in points]
+    ys = [p[1] for p in points]
+    if not xs:
+        return None
+    min_x = min(xs)
+    min_y = min(ys)
+    return (min_x, min_y, max(xs) - min_x, max(ys) - min_y)
 
 
 def extend_bounding_box(rect, point=None, rect2=None):
@@ -114,6 +113,12 @@ def extend_bounding_box(rect, point=None, rect2=None):
 
 
 PDC2PNG = os.path.join(os.path.dirname(os.path.realpath(__file__)), "../bin/pdc2png")
+# native builds that ../bin/pdc2png dispatches to; running them directly saves starting a shell
+# and a Python interpreter for every conversion
+PDC2PNG_NATIVE = {
+    'Darwin': PDC2PNG + '_osx',
+    'Linux': PDC2PNG + '_linux',
+}.get(platform.system(), PDC2PNG)
 
 
 def convert_to_png(pdc_data):
@@ -123,8 +128,7 @@ def convert_to_png(pdc_data):
         with open(pdc_path, "wb") as pdc_file:
             pdc_file.write(pdc_data)
 
-        cmd = '%s %s' % (PDC2PNG, pdc_path)
-        p = Popen(cmd, shell=True, stdout=PIPE, stderr=PIPE)
+        p = Popen([PDC2PNG_NATIVE, pdc_path], stdout=PIPE, stderr=PIPE)
         stdout, stderr = p.communicate()
         if p.returncode != 0:
             raise IOError(stderr)
@@ -136,7 +140,7 @@ def convert_to_png(pdc_data):
         shutil.rmtree(tmp_dir)
 
 
-class Command:
+class Command(object):
     '''
     Draw command serialized structure:
     | Bytes | Field
@@ -157,6 +161,7 @@ class Command:
     | 2     | x
     | 2     | y
     '''
+    __slots__ = ('points', 'converted_points', 'stroke_width', 'stroke_color', 'fill_color')
 
     def __init__(self, points, stroke_width=0, stroke_color=0, fill_color=0,
                  raise_error=False):
@@ -166,6 +171,7 @@ class Command:
         #         raise InvalidPointException("Invalid point in command")
 
         self.points = list(points)
+        self.converted_points = None  # pebble coordinates of self.points, set by finalize()
         self.stroke_width = stroke_width
         self.stroke_color = stroke_color
         self.fill_color = fill_color
@@ -174,27 +180,23 @@ class Command:
         return False
 
     def transform(self, transformer):
-        self.points = list([transformer.transform_point(p) for p in self.points])
+        self.points = [transformer.transform_point(p) for p in self.points]
+        self.converted_points = None
 
     def finalize(self, annotator):
         grid_annotation = None
-        for p in self.points:
-            converted, problem = convert_to_pebble_coordinates(p, self.is_precise())
-
-            if problem is not None:
-                if grid_annotation is None:
-                    link = "https://pebbletechnology.atlassian.net/wiki/display/DEV/Pebble+Draw+Commands#PebbleDrawCommands-issue-pixelgrid"
-                    grid_annotation = annotator.add_annotation("Element is expressed with unsupported coordinate(s).", link=link)
-                grid_annotation.add_highlight(p[0], p[1], details=problem)
+        self.converted_points, problems = convert_points_to_pebble_coordinates(self.points, self.is_precise())
+        for p, problem in problems:
+            if grid_annotation is None:
+                link = "https://pebbletechnology.atlassian.net/wiki/display/DEV/Pebble+Draw+Commands#PebbleDrawCommands-issue-pixelgrid"
+                grid_annotation = annotator.add_annotation("Element is expressed with unsupported coordinate(s).", link=link)
+            grid_annotation.add_highlight(p[0], p[1], details=problem)
 
 
         pass
 
     def bounding_box(self):
-        result = None
-        for p in self.points:
-            result = extend_bounding_box(result, point=p)
-        return result
+        return bounding_box_around_points(self.points)
 
     def serialize_common(self):
         return pack('<BBBB',
@@ -204,16 +206,21 @@ class Command:
                     self.fill_color)
 
     def serialize_points(self):
-        s = pack('H', len(self.points))  # number of points (16-bit)
-        for p in self.points:
-            converted, _ = convert_to_pebble_coordinates(p, self.is_precise())
-            s += pack('<hh',
-                      int(converted[0]),        # x (16-bit)
-                      int(converted[1]))        # y (16-bit)
-        return s
+        converted_points = self.converted_points
+        if converted_points is None:
+            converted_points = convert_points_to_pebble_coordinates(self.points, self.is_precise())[0]
+        count = len(converted_points)
+        point_array_struct = _point_array_structs.get(count)
+        if point_array_struct is None:
+            # number of points (16-bit), followed by x, y (16-bit each) for every point
+            point_array_struct = _point_array_structs[count] = Struct('<H%dh' % (2 * count))
+        coordinates = [int(c) for converted in converted_points for c in converted[:2]]
+        return point_array_struct.pack(count, *coordinates)
 
 
 class PathCommand(Command):
+    __slots__ = ('open', 'type')
+
     def __init__(self, points, path_open, stroke_width=0, stroke_color=0, fill_color=0, precise=False,
                  raise_error=False):
         self.open = path_open
@@ -224,7 +231,7 @@ class PathCommand(Command):
         return self.type == DRAW_COMMAND_TYPE_PRECISE_PATH
 
     def serialize(self):
-        s = pack('B', self.type)   # command type
+        s = bytearray(pack('B', self.type))   # command type
         s += self.serialize_common()
         s += pack('<BB',
                   int(self.open),   # open path boolean
@@ -248,7 +255,9 @@ class PathCommand(Command):
                                                                                          type)
 
 
-class CircleCommand(object, Command):
+class CircleCommand(Command):
+    __slots__ = ('radius',)
+
     def __init__(self, center, radius, stroke_width=0, stroke_color=0, fill_color=0):
         points = [(center[0], center[1])]
         Command.__init__(self, points, stroke_width, stroke_color, fill_color)
@@ -268,7 +277,7 @@ class CircleCommand(object, Command):
 
 
     def serialize(self):
-        s = pack('B', DRAW_COMMAND_TYPE_CIRCLE)  # command type
+        s = bytearray(pack('B', DRAW_COMMAND_TYPE_CIRCLE))  # command type
         s += self.serialize_common()
         s += pack('H', self.radius)  # circle radius (16-bit)
         s += self.serialize_points()
@@ -287,17 +296,16 @@ def serialize_header(size):
 
 
 def serialize(commands):
-    output = pack('H', len(commands))   # number of commands in list
+    output = bytearray(pack('H', len(commands)))   # number of commands in list
     for c in commands:
         output += c.serialize()
 
-    return output
+    return bytes(output)
 
 def serialize_image(commands, size):
-    s = serialize_header(size)
-    s += serialize(commands)
+    s = serialize_header(size) + serialize(commands)
 
-    output = "PDCI"
+    output = bytearray(b"PDCI")
     output += pack('I', len(s))
     output += s
-    return output
+    return bytes(output)
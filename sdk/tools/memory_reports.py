@@ -12,6 +12,20 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+# Report templates are shared by every report printed during a build, so build them only once
+_APP_LABEL = "-------------------------------------------------------\n{} {} MEMORY USAGE\n"
+_LABEL = "-------------------------------------------------------\n{} MEMORY USAGE\n"
+_APP_RESOURCE_SIZE = "Total size of resources:        {} bytes / {}KB\n"
+_APP_MEMORY_USAGE = ("Total footprint in RAM:         {} bytes / {}KB\n"
+                     "Free RAM available (heap):      {} bytes\n"
+                     "-------------------------------------------------------")
+_BYTECODE_USAGE = ("Total size of snapshot:        {}KB / {}KB\n"
+                   "-------------------------------------------------------")
+_RESOURCE_SIZE = "Total size of resources:        {} bytes\n"
+_MEMORY_USAGE = ("Total footprint in RAM:         {} bytes\n"
+                 "-------------------------------------------------------")
+
+
 def _convert_bytes_to_kilobytes(number_bytes):
     """
     Convert the input from bytes into kilobytes
@@ -36,20 +50,11 @@ def app_memory_report(platform_name, bin_type, app_size, max_ram, free_ram, reso
     :param max_resource_size: the maximum allowed size of the resource pack
     :return: a tuple containing the color for the string print, and the string to print
     """
-    LABEL = "-------------------------------------------------------\n{} {} MEMORY USAGE\n"
-    RESOURCE_SIZE = "Total size of resources:        {} bytes / {}KB\n"
-    MEMORY_USAGE = ("Total footprint in RAM:         {} bytes / {}KB\n"
-                    "Free RAM available (heap):      {} bytes\n"
-                    "-------------------------------------------------------")
-
+    report = _APP_LABEL.format(platform_name.upper(), bin_type.upper())
     if resource_size and max_resource_size:
-        report = (LABEL.format(platform_name.upper(), bin_type.upper()) +
-                  RESOURCE_SIZE.format(resource_size,
-                                       _convert_bytes_to_kilobytes(max_resource_size)) +
-                  MEMORY_USAGE.format(app_size, _convert_bytes_to_kilobytes(max_ram), free_ram))
-    else:
-        report = (LABEL.format(platform_name.upper(), bin_type.upper()) +
-                  MEMORY_USAGE.format(app_size, _convert_bytes_to_kilobytes(max_ram), free_ram))
+        report += _APP_RESOURCE_SIZE.format(resource_size,
+                                            _convert_bytes_to_kilobytes(max_resource_size))
+    report += _APP_MEMORY_USAGE.format(app_size, _convert_bytes_to_kilobytes(max_ram), free_ram)
 
     return 'YELLOW', report
 
@@ -102,13 +107,9 @@ def bytecode_memory_report(platform_name, bytecode_size, bytecode_max):
     :param bytecode_max: the max allowed size of the bytecode file, in bytes
     :return: a tuple containing the color for the string print, and the string to print
     """
-    LABEL = "-------------------------------------------------------\n{} MEMORY USAGE\n"
-    BYTECODE_USAGE = ("Total size of snapshot:        {}KB / {}KB\n"
-                      "-------------------------------------------------------")
-
-    report = (LABEL.format(platform_name.upper()) +
-              BYTECODE_USAGE.format(_convert_bytes_to_kilobytes(bytecode_size),
-                                    _convert_bytes_to_kilobytes(bytecode_max)))
+    report = (_LABEL.format(platform_name.upper()) +
+              _BYTECODE_USAGE.format(_convert_bytes_to_kilobytes(bytecode_size),
+                                     _convert_bytes_to_kilobytes(bytecode_max)))
 
     return 'YELLOW', report
 
@@ -122,17 +123,9 @@ def simple_memory_report(platform_name, bin_size, resource_size=None):
     :param resource_size: the size of the resource pack
     :return: a tuple containing the color for the string print, and the string to print
     """
-    LABEL = "-------------------------------------------------------\n{} MEMORY USAGE\n"
-    RESOURCE_SIZE = "Total size of resources:        {} bytes\n"
-    MEMORY_USAGE = ("Total footprint in RAM:         {} bytes\n"
-                    "-------------------------------------------------------")
-
+    report = _LABEL.format(platform_name.upper())
     if resource_size:
-        report = (LABEL.format(platform_name.upper()) +
-                  RESOURCE_SIZE.format(resource_size) +
-                  MEMORY_USAGE.format(bin_size))
-    else:
-        report = (LABEL.format(platform_name.upper()) +
-                  MEMORY_USAGE.format(bin_size))
+        report += _RESOURCE_SIZE.format(resource_size)
+    report += _MEMORY_USAGE.format(bin_size)
 
     return 'YELLOW', report
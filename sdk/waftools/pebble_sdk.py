@@ -174,6 +174,7 @@ def configure(conf):
     project_info = _extract_project_info(conf, info_json, info_json_node.name)
 
     conf.env.PROJECT_INFO = project_info
+    conf.env.APP_INFO_JSON_PATH = info_json_node.abspath()
     conf.env.BUILD_TYPE = 'rocky' if project_info.get('projectType', None) == 'rocky' else 'app'
 
     if getattr(conf.env.PROJECT_INFO, 'enableMultiJS', False):
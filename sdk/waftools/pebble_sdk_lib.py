@@ -60,6 +60,7 @@ def configure(conf):
     validate_message_keys_object(conf, project_info, 'package.json')
 
     conf.env.PROJECT_INFO = project_info
+    conf.env.APP_INFO_JSON_PATH = package_json_node.abspath()
     conf.env.BUILD_TYPE = 'lib'
     conf.env.REQUESTED_PLATFORMS = project_info.get('targetPlatforms', [])
     conf.env.LIB_DIR = "node_modules"
@@ -15,6 +15,7 @@
 import json
 import os
 import subprocess
+from collections import deque
 from string import Template
 from waflib.Errors import WafError
 from waflib.TaskGen import before_method, feature
@@ -38,8 +39,11 @@ def process_rocky_js(task_gen):
     """
     bld = task_gen.bld
     task_gen.mappings = {'': (lambda task_gen, node: None)}
-    js_nodes = task_gen.to_nodes(task_gen.source)
+    # Store the resolved nodes back on the task generator so that subsequent methods operating on
+    # the same task generator (ie. `process_source`) don't resolve every path a second time
+    task_gen.source = task_gen.to_nodes(task_gen.source)
     target = task_gen.to_nodes(task_gen.target)
+    js_nodes = list(task_gen.source)
     if not js_nodes:
         task_gen.bld.fatal("Project does not contain any source code.")
     js_nodes.append(find_sdk_component(bld, task_gen.env, 'include/rocky.js'))
@@ -211,9 +215,9 @@ class merge_js(Task.Task):
         pebble_packages = [str(lib['name']) for lib in bld.env.LIB_JSON if 'pebble' in lib]
         aliases = {lib: "{}/dist/js".format(lib) for lib in pebble_packages}
 
-        info_json_file = bld.path.find_node('package.json') or bld.path.find_node('appinfo.json')
-        if info_json_file:
-            aliases.update({'app_package.json': info_json_file.abspath()})
+        # The project info file (package.json or appinfo.json) is resolved once during configure
+        if self.env.APP_INFO_JSON_PATH:
+            aliases['app_package.json'] = self.env.APP_INFO_JSON_PATH
 
         config_file = (
             bld.path.get_bld().make_node("webpack/{}/webpack.config.js".format(js_build_type)))
@@ -254,13 +258,37 @@ class lint_js(Task.Task):
         """
         self.name = 'lint_js'
         js_nodes = self.inputs
+
+        # Keep a few linter processes running so that the Node.js startup cost of each one overlaps
+        # with the others, and collect the results in order. waf already runs up to `-j` tasks at
+        # once, so stay within that rather than starting one process per CPU on top of it.
+        max_procs = max(1, self.generator.bld.jobs)
+        running = deque()
         for js_node in js_nodes:
             cmd = self.linter + [js_node.path_from(self.generator.bld.path)]
-            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            out, err = proc.communicate()
-            if err:
-                Logs.pprint('CYAN', "\n========== Lint Results: {} ==========\n".format(js_node))
-                Logs.pprint('WHITE', "{}\n{}\n".format(out, err))
-
-                if proc.returncode != 0:
-                    self.generator.bld.fatal("Project failed linting.")
+            running.append((js_node, subprocess.Popen(cmd, stdout=subprocess.PIPE,
+                                                      stderr=subprocess.PIPE)))
+            if len(running) >= max_procs:
+                self._check_lint_result(running)
+        while running:
+            self._check_lint_result(running)
+
+    def _check_lint_result(self, running):
+        """
+        Waits for the oldest running linter process and reports its results, stopping the build
+        (and the remaining linter processes) if the file failed linting
+        :param running: deque of (js_node, process) tuples for the running linter processes
+        :return: N/A
+        """
+        js_node, proc = running.popleft()
+        out, err = proc.communicate()
+        if err:
+            Logs.pprint('CYAN', "\n========== Lint Results: {} ==========\n".format(js_node))
+            Logs.pprint('WHITE', "{}\n{}\n".format(out, err))
+
+            if proc.returncode != 0:
+                for _, other_proc in running:
+                    if other_proc.poll() is None:
+                        other_proc.kill()
+                    other_proc.communicate()
+                self.generator.bld.fatal("Project failed linting.")
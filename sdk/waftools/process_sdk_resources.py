@@ -90,11 +90,14 @@ def generate_resources(bld, resource_source_path):
     resource_definitions = []
     max_menu_icon_dimensions = (25, 25)
     for r in resources_json:
+        # Every definition generated from this entry shares its targetPlatforms, so drop entries
+        # for other platforms before doing any file lookups or validation for them
+        target_platforms = r.get('targetPlatforms', None)
+        if target_platforms is not None and bld.env.PLATFORM_NAME not in target_platforms:
+            continue
+
         if 'menuIcon' in r and r['menuIcon']:
-            res_file = (
-                resources_node.find_node(find_most_specific_filename(bld, bld.env,
-                                                                     resources_node,
-                                                                     str(r['file'])))).abspath()
+            res_file = resources_node.find_node(resource_file_mapping[r['name']]).abspath()
             if not validate_resource_not_larger_than(bld, res_file,
                                                      dimensions=max_menu_icon_dimensions):
                 bld.fatal("menuIcon resource '{}' exceeds the maximum allowed dimensions of {}".
@@ -21,6 +21,16 @@ from resources.types.resource_definition import ResourceDefinition
 from resources.types.resource_object import ResourceObject
 from sdk_helpers import validate_resource_not_larger_than
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Column of each timeline resource size within a row of the timeline lookup table
+TIMELINE_RESOURCE_SIZE_INDEX = {'tiny': 0, 'small': 1, 'large': 2}
+TIMELINE_RESOURCE_TABLE_ENTRY = struct.Struct('<III')
+TLUT_SIGNATURE = b'TLUT'
+
 
 class layouts_json(Task.Task):
     """
@@ -32,16 +42,19 @@ class layouts_json(Task.Task):
         This method executes when the layouts JSON task runs
         :return: N/A
         """
-        published_media_dict = {m['id']: m['name'] for m in self.published_media}
-        timeline_entries = [{'id': media_id, 'name': media_name} for media_id, media_name in
-                            published_media_dict.iteritems()]
+        # publishedMedia IDs are validated to be unique in `process_timeline_resources`
         image_uris = {
-            'resources': {'app://images/' + r['name']: r['id'] for r in timeline_entries}
+            'resources': {'app://images/' + m['name']: m['id'] for m in self.published_media}
         }
 
-        # Write a dictionary (created from map output) to a json file in the build directory
-        with open(self.outputs[0].abspath(), 'w') as f:
-            json.dump(image_uris, f, indent=8)
+        # Write a dictionary (created from map output) to a json file in the build directory,
+        # using the faster orjson encoder when it is installed
+        if orjson:
+            with open(self.outputs[0].abspath(), 'wb') as f:
+                f.write(orjson.dumps(image_uris))
+        else:
+            with open(self.outputs[0].abspath(), 'w') as f:
+                json.dump(image_uris, f, separators=(',', ':'))
 
 
 def _collect_lib_published_media(ctx):
@@ -71,75 +84,74 @@ class timeline_reso(Task.Task):
         This method executes when the timeline reso task runs
         :return: N/A
         """
-        bld = self.generator.bld
-        resource_id_mapping = self.env.RESOURCE_ID_MAPPING
-
-        TIMELINE_RESOURCE_TABLE_ENTRY_FMT = '<III'
-        TLUT_SIGNATURE = 'TLUT'
-
-        timeline_resources = []
-        published_media_from_libs = _collect_lib_published_media(self.generator)
-
-        # Create a sparse table to represent a c-style array
-        for item in self.published_media:
-            timeline_id = item.get('id', None)
-            published_media_name = item.get('name', None)  # string representation of published_id
-            build_type = self.env.BUILD_TYPE
-
-            timeline_tiny_exists = 'timeline' in item and 'tiny' in item['timeline']
-            if 'glance' in item:
-                # Alias ['timeline']['tiny'] to ['glance'] if missing, or validate
-                # ['timeline']['tiny'] == ['glance'] if both exist
-                if not timeline_tiny_exists:
-                    timeline = item.pop('timeline', {})
-                    timeline.update({'tiny': item['glance']})
-                    item['timeline'] = timeline
-                elif item['glance'] != item['timeline']['tiny']:
-                    bld.fatal("Resource {} in publishedMedia specifies different values {} and {}"
-                              "for ['glance'] and ['timeline']['tiny'] attributes, respectively. "
-                              "Differing values for these fields are not supported.".
-                              format(item['name'], item['glance'], item['timeline']['tiny']))
-            else:
-                if not timeline_tiny_exists:
-                    if 'alias' in item and build_type != 'lib':
-                        # Substitute package-defined publishedMedia item for objects with `alias`
-                        # defined
-                        for definition in published_media_from_libs:
-                            if definition['name'] == item['alias']:
-                                del item['alias']
-                                del definition['name']
-                                item.update(definition)
-                                break
-                        else:
-                            bld.fatal("No resource for alias '{}' exists in installed packages".
-                                      format(item['alias']))
-                    else:
-                        bld.fatal("Resource {} in publishedMedia is missing values for ['glance'] "
-                                  "and ['timeline']['tiny'].".format(published_media_name))
-
-            # Extend table if needed
-            if timeline_id >= len(timeline_resources):
-                timeline_resources.extend({'tiny': 0, 'small': 0, 'large': 0} for x in
-                                          range(len(timeline_resources), timeline_id + 1))
-
-            # Set the resource IDs for this timeline item
-            for size, res_id in item['timeline'].iteritems():
-                if res_id not in resource_id_mapping:
-                    bld.fatal("Invalid resource ID {} specified in publishedMedia".format(res_id))
-                timeline_resources[timeline_id][size] = resource_id_mapping[res_id]
-
-        # Serialize the table
-        table = TLUT_SIGNATURE
-        for r in timeline_resources:
-            table += struct.pack(TIMELINE_RESOURCE_TABLE_ENTRY_FMT,
-                                 r['tiny'],
-                                 r['small'],
-                                 r['large'])
-
+        # The table rows have already been resolved by `process_timeline_resources`, so all that is
+        # left to do here is to serialize them
+        table = _serialize_timeline_lookup_table(self.timeline_resources)
         r = ResourceObject(ResourceDefinition('raw', 'TIMELINE_LUT', ''), table)
         r.dump(self.outputs[0])
 
 
+def _serialize_timeline_lookup_table(timeline_resources):
+    """
+    Packs the rows of the timeline lookup table into a single preallocated buffer. The buffer is
+    zero-filled, so only the IDs that are in use need to be packed into it.
+    :param timeline_resources: a dictionary of [tiny, small, large] resource ID rows, keyed by
+                               publishedMedia ID
+    :return: the serialized table, with all-zero rows for the unused IDs below the largest one
+    """
+    num_entries = max(timeline_resources) + 1 if timeline_resources else 0
+    entry_size = TIMELINE_RESOURCE_TABLE_ENTRY.size
+    table = bytearray(len(TLUT_SIGNATURE) + entry_size * num_entries)
+    table[:len(TLUT_SIGNATURE)] = TLUT_SIGNATURE
+    for timeline_id, r in timeline_resources.items():
+        TIMELINE_RESOURCE_TABLE_ENTRY.pack_into(table,
+                                                len(TLUT_SIGNATURE) + entry_size * timeline_id, *r)
+    return bytes(table)
+
+
+def _normalize_timeline_item(ctx, item, published_media_from_libs):
+    """
+    Fills in the ['timeline'] attributes of a publishedMedia item, either by aliasing
+    ['timeline']['tiny'] to ['glance'] or by substituting the package-defined publishedMedia item
+    the item's `alias` refers to
+    :param ctx: the task generator instance
+    :param item: the publishedMedia item, which is modified in place
+    :param published_media_from_libs: a dictionary of package-defined publishedMedia items, keyed
+                                      by name
+    :return: N/A
+    """
+    bld = ctx.bld
+    published_media_name = item.get('name', None)  # string representation of published_id
+
+    timeline_tiny_exists = 'timeline' in item and 'tiny' in item['timeline']
+    if 'glance' in item:
+        # Alias ['timeline']['tiny'] to ['glance'] if missing, or validate
+        # ['timeline']['tiny'] == ['glance'] if both exist
+        if not timeline_tiny_exists:
+            timeline = item.pop('timeline', {})
+            timeline.update({'tiny': item['glance']})
+            item['timeline'] = timeline
+        elif item['glance'] != item['timeline']['tiny']:
+            bld.fatal("Resource {} in publishedMedia specifies different values {} and {}"
+                      "for ['glance'] and ['timeline']['tiny'] attributes, respectively. "
+                      "Differing values for these fields are not supported.".
+                      format(item['name'], item['glance'], item['timeline']['tiny']))
+    else:
+        if not timeline_tiny_exists:
+            if 'alias' in item and ctx.env.BUILD_TYPE != 'lib':
+                # Substitute package-defined publishedMedia item for objects with `alias`
+                # defined
+                definition = published_media_from_libs.get(item['alias'])
+                if definition is None:
+                    bld.fatal("No resource for alias '{}' exists in installed packages".
+                              format(item['alias']))
+                del item['alias']
+                item.update((k, v) for k, v in definition.items() if k != 'name')
+            else:
+                bld.fatal("Resource {} in publishedMedia is missing values for ['glance'] "
+                          "and ['timeline']['tiny'].".format(published_media_name))
+
+
 def _get_resource_file(ctx, mapping, resource_id, resources_node=None):
     try:
         resource = mapping[resource_id]
@@ -174,6 +186,10 @@ def process_timeline_resources(task_gen):
     bld = task_gen.bld
     build_type = task_gen.env.BUILD_TYPE
     published_media = task_gen.published_media
+    if not published_media:
+        # Nothing to validate, and neither a timeline lookup table nor a layouts file is needed
+        return
+
     timeline_resource_table = task_gen.timeline_reso
     layouts_json = task_gen.layouts_json
     mapping = task_gen.resource_mapping
@@ -185,7 +201,29 @@ def process_timeline_resources(task_gen):
         'large': (80, 80)
     }
 
-    used_ids = []
+    # The same resource is frequently referenced by several publishedMedia items and attributes,
+    # and several resource IDs may share a file, so only resolve each resource ID once and only
+    # read the header of each file once per maximum size
+    resource_files = {}
+    resource_fits = {}
+
+    def _resource_fits(resource_id, max_size):
+        if resource_id not in resource_files:
+            resource_files[resource_id] = _get_resource_file(task_gen, mapping, resource_id)
+        res_file = resource_files[resource_id]
+        if (res_file, max_size) not in resource_fits:
+            resource_fits[(res_file, max_size)] = (
+                validate_resource_not_larger_than(bld, res_file, max_size))
+        return resource_fits[(res_file, max_size)]
+
+    resource_id_mapping = task_gen.env.RESOURCE_ID_MAPPING
+    published_media_from_libs = {definition['name']: definition for definition in
+                                 _collect_lib_published_media(task_gen)}
+
+    # Validate each item and build the rows of the timeline lookup table in the same pass; the
+    # rows are kept sparse, keyed by publishedMedia ID, and unused IDs are zero-filled on output
+    timeline_resources = {}
+    used_ids = set()
     for item in published_media:
         if 'id' not in item:
             # Pebble Package builds omit the ID
@@ -201,12 +239,11 @@ def process_timeline_resources(task_gen):
                                "Please modify your publishedMedia items to only use the ID {} once".
                                format(item['id']))
         else:
-            used_ids.append(item['id'])
+            used_ids.add(item['id'])
 
         # Check for valid resource dimensions
         if 'glance' in item:
-            res_file = _get_resource_file(task_gen, mapping, item['glance'])
-            if not validate_resource_not_larger_than(task_gen.bld, res_file, MAX_SIZES['glance']):
+            if not _resource_fits(item['glance'], MAX_SIZES['glance']):
                 bld.fatal("publishedMedia item '{}' specifies a resource '{}' for attribute "
                           "'glance' that exceeds the maximum allowed dimensions of {} x {} for "
                           "that attribute.".
@@ -215,18 +252,30 @@ def process_timeline_resources(task_gen):
         if 'timeline' in item:
             for size in ('tiny', 'small', 'large'):
                 if size in item['timeline']:
-                    res_file = _get_resource_file(task_gen, mapping, item['timeline'][size])
-                    if not validate_resource_not_larger_than(task_gen.bld, res_file,
-                                                             MAX_SIZES[size]):
+                    # 'glance' and 'tiny' share the same maximum dimensions, so a tiny resource
+                    # that is also the glance resource has already been validated above
+                    if size == 'tiny' and item['timeline']['tiny'] == item.get('glance'):
+                        continue
+                    if not _resource_fits(item['timeline'][size], MAX_SIZES[size]):
                         bld.fatal("publishedMedia item '{}' specifies a resource '{}' for size '{}'"
                                   " that exceeds the maximum allowed dimensions of {} x {} for "
                                   " that size.".
                                   format(item['name'], mapping[item['timeline'][size]], size,
                                          MAX_SIZES[size][0], MAX_SIZES[size][1]))
 
+        _normalize_timeline_item(task_gen, item, published_media_from_libs)
+
+        # Set the resource IDs for this timeline item
+        timeline_row = timeline_resources[item['id']] = [0, 0, 0]
+        for size, res_id in item['timeline'].items():
+            if res_id not in resource_id_mapping:
+                bld.fatal("Invalid resource ID {} specified in publishedMedia".format(res_id))
+            if size in TIMELINE_RESOURCE_SIZE_INDEX:
+                timeline_row[TIMELINE_RESOURCE_SIZE_INDEX[size]] = resource_id_mapping[res_id]
+
     timeline_reso_task = task_gen.create_task('timeline_reso',
                                               src=None, tgt=timeline_resource_table)
-    timeline_reso_task.published_media = published_media
+    timeline_reso_task.timeline_resources = timeline_resources
 
     layouts_json_task = task_gen.create_task('layouts_json', src=None, tgt=layouts_json)
     layouts_json_task.published_media = published_media
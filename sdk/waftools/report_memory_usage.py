@@ -45,9 +45,10 @@ class memory_usage_report(Task.Task):
         max_ram, max_resources, max_appstore_resources = self.max_sizes
 
         # Handle zero-size binaries (more common with packages)
-        ram_size = sum(size(bin_path)) if size(bin_path) != 0 else 0
+        bin_sizes = size(bin_path)
+        ram_size = sum(bin_sizes) if bin_sizes != 0 else 0
 
-        resource_size = os.stat(resources_path).st_size if resources_path else None
+        resource_size = os.path.getsize(resources_path) if resources_path else None
         if resource_size and max_resources and max_appstore_resources:
             if resource_size > max_resources:
                 Logs.pprint(*app_appstore_resource_memory_error(platform, resource_size,
@@ -85,10 +86,11 @@ def generate_memory_usage_report(task_gen):
     app, worker, lib, resources = (getattr(task_gen, attr, None)
                                    for attr in ('app', 'worker', 'lib', 'resources'))
 
-    max_resources = task_gen.env.PLATFORM["MAX_RESOURCES_SIZE"]
-    max_resources_appstore = task_gen.env.PLATFORM["MAX_RESOURCES_SIZE_APPSTORE"]
-    app_max_ram = task_gen.env.PLATFORM["MAX_APP_MEMORY_SIZE"] if app else None
-    worker_max_ram = task_gen.env.PLATFORM["MAX_WORKER_MEMORY_SIZE"] if worker else None
+    platform = task_gen.env.PLATFORM
+    max_resources = platform["MAX_RESOURCES_SIZE"]
+    max_resources_appstore = platform["MAX_RESOURCES_SIZE_APPSTORE"]
+    app_max_ram = platform["MAX_APP_MEMORY_SIZE"] if app else None
+    worker_max_ram = platform["MAX_WORKER_MEMORY_SIZE"] if worker else None
 
     if app:
         app_task = task_gen.create_task('memory_usage_report',
@@ -12,10 +12,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import copy
 import json
 import os
 import struct
-import re
+import zipfile
 
 from waflib import Logs
 
@@ -24,53 +25,139 @@ from pebble_sdk_platform import pebble_platforms, maybe_import_internal
 from pebble_sdk_version import set_env_sdk_version
 from resources.types.resource_object import ResourceObject
 
+# Width and height fields of the supported image resource headers
+_PBI_SIZE = struct.Struct('<hh')
+_PDC_SIZE = struct.Struct('<hh')
+_PNG_SIZE = struct.Struct('>II')
 
-def _get_pbi_size(data):
+_IHDR_MAGIC = b'IHDR'
+_PDCI_MAGIC = b'PDCI'
+_PNG_MAGIC = b'\x89PNG'
+
+# Written into a library's dist folder once its dist.zip has been extracted there
+_UNPACKED_MARKER = '.unpacked'
+
+
+def _get_pbi_size(data, offset=0):
     """
     This method takes resource data and determines the dimensions of the pbi
-    :param data: the data contained in the pbi, starting at the header
+    :param data: the data contained in the pbi
+    :param offset: the offset of the pbi header within `data`
     :return: tuple containing the width and height of the pbi
     """
-    # Read the first byte at header offset 0x08 for width
-    width = struct.unpack('<h', data[8:10])[0]
-
-    # Read the next 2 bytes after the width to get the height
-    height = struct.unpack('<h', data[10:12])[0]
+    # Read the width and height, 2 bytes each, starting at header offset 0x08
+    return _PBI_SIZE.unpack_from(data, offset + 8)
 
-    return width, height
 
-
-def _get_pdc_size(data):
+def _get_pdc_size(data, offset=0):
     """
     This method takes resource data and determines the dimensions of the PDC
-    :param data: the data contained in the PDC, starting at the header
+    :param data: the data contained in the PDC
+    :param offset: the offset of the PDC header (following the magic word) within `data`
     :return: tuple containing the width and height of the PDC
     """
-    # Read the first 2 bytes at header offset 0x06 for width
-    width = struct.unpack('>I', data[6:8])[0]
-
-    # Read the next 2 bytes after the width to get the height
-    height = struct.unpack('>I', data[8:10])[0]
-
-    return width, height
+    # Read the width and height, 2 bytes each, starting at header offset 0x06
+    return _PDC_SIZE.unpack_from(data, offset + 6)
 
 
-def _get_png_size(data):
+def _get_png_size(data, offset=0):
     """
     This resource takes resource data and determines the dimensions of the PNG
-    :param data: the data contained in the PNG, starting at the IHDR
+    :param data: the data contained in the PNG
+    :param offset: the offset of the IHDR within `data`
     :return: tuple containing the width and height of the PNG
     """
     # Assert that this is the IHDR header
-    assert data[:4] == 'IHDR'
+    assert data.startswith(_IHDR_MAGIC, offset)
 
-    # Read the first 4 bytes after IHDR for width
-    width = struct.unpack('>I', data[4:8])[0]
+    # Read the width and height, 4 bytes each, immediately following IHDR
+    return _PNG_SIZE.unpack_from(data, offset + 4)
 
-    # Read the next 4 bytes after the width to get the height
-    height = struct.unpack('>I', data[8:12])[0]
 
-    return width, height
+def _find_sdk_components(root, components):
+    """
+    This method determines which of the specified SDK components exist beneath a folder, reading
+    each directory involved only once
+    :param root: the absolute path of the folder to search
+    :param components: a list of component paths, relative to `root`
+    :return: a set containing the components that exist
+    """
+    listings = {}
+    found_components = set()
+    for component in components:
+        parent, name = os.path.split(component)
+        if parent not in listings:
+            try:
+                listings[parent] = set(os.listdir(os.path.join(root, parent)))
+            except OSError:
+                listings[parent] = set()
+        if name in listings[parent]:
+            found_components.add(component)
+    return found_components
+
+
+def _get_cached_node(ctx, path, create=False):
+    """
+    This method memoizes the Node for an absolute path on the context, as the same few SDK folders
+    and generated files are resolved many times over a build
+    :param ctx: the Context object
+    :param path: the absolute path to resolve
+    :param create: whether to create the Node if it does not exist (as with `make_node`)
+    :return: the Node for the path, or None if it does not exist and `create` is False
+    """
+    try:
+        node_cache = ctx.sdk_node_cache
+    except AttributeError:
+        node_cache = ctx.sdk_node_cache = {}
+    node = node_cache.get((path, create))
+    if node is None:
+        node = ctx.root.make_node(path) if create else ctx.root.find_node(path)
+        # Don't remember missing paths, as they may be created later in the build
+        if node is not None:
+            node_cache[(path, create)] = node
+    return node
+
+
+def _is_library_unpacked(dist_zip_path, dist_path):
+    """
+    This method determines whether a library's dist.zip has already been extracted into its dist
+    folder, and that none of the extracted files have since been removed or modified
+    :param dist_zip_path: the absolute path to the dist.zip file
+    :param dist_path: the absolute path of the folder the package is extracted into
+    :return: True if the extracted package is up to date, False if it needs to be extracted again
+    """
+    try:
+        unpacked_time = os.path.getmtime(os.path.join(dist_path, _UNPACKED_MARKER))
+        if os.path.getmtime(dist_zip_path) > unpacked_time:
+            return False
+        with zipfile.ZipFile(dist_zip_path) as zip_file:
+            names = zip_file.namelist()
+        # The marker is written after extraction, so anything newer has been changed since
+        for name in names:
+            if os.path.getmtime(os.path.join(dist_path, name)) > unpacked_time:
+                return False
+    except OSError:
+        return False
+    return True
+
+
+def _load_package_json(ctx, path):
+    """
+    This method parses a package.json file, reusing the result if the file has already been parsed
+    in this context, as nested packages are read both for duplicate detection and while processing
+    dependencies
+    :param ctx: the Context object
+    :param path: the absolute path to the package.json file
+    :return: a copy of the parsed contents of the file, which the caller is free to modify
+    """
+    try:
+        package_json_cache = ctx.sdk_package_json_cache
+    except AttributeError:
+        package_json_cache = ctx.sdk_package_json_cache = {}
+    if path not in package_json_cache:
+        with open(path) as f:
+            package_json_cache[path] = json.load(f)
+    return copy.deepcopy(package_json_cache[path])
 
 
 def _get_supported_platforms(ctx, has_rocky=False):
@@ -80,23 +167,32 @@ def _get_supported_platforms(ctx, has_rocky=False):
     :param ctx: the Context object
     :return: a list of the platforms that are supported for the given SDK
     """
-    sdk_check_nodes = ['lib/libpebble.a',
-                       'pebble_app.ld.template',
-                       'tools',
-                       'include',
-                       'include/pebble.h']
-    supported_platforms = os.listdir(ctx.env.PEBBLE_SDK_ROOT)
-
-    invalid_platforms = []
-    for platform in supported_platforms:
-        pebble_sdk_platform = ctx.root.find_node(ctx.env.PEBBLE_SDK_ROOT).find_node(platform)
-        for node in sdk_check_nodes:
-            if pebble_sdk_platform.find_node(node) is None:
-                if ctx.root.find_node(ctx.env.PEBBLE_SDK_COMMON).find_node(node) is None:
-                    invalid_platforms.append(platform)
-                    break
-    for platform in invalid_platforms:
-        supported_platforms.remove(platform)
+    # The platforms installed in the SDK don't change during a configure, so only scan the
+    # filesystem the first time through
+    if ctx.env.SDK_INSTALLED_PLATFORMS:
+        supported_platforms = list(ctx.env.SDK_INSTALLED_PLATFORMS)
+    else:
+        sdk_check_nodes = ['lib/libpebble.a',
+                           'pebble_app.ld.template',
+                           'tools',
+                           'include',
+                           'include/pebble.h']
+        supported_platforms = os.listdir(ctx.env.PEBBLE_SDK_ROOT)
+
+        # Components in the common folder are shared by every platform, so only look them up once
+        common_nodes = _find_sdk_components(ctx.env.PEBBLE_SDK_COMMON, sdk_check_nodes)
+        platform_check_nodes = [node for node in sdk_check_nodes if node not in common_nodes]
+
+        invalid_platforms = []
+        for platform in supported_platforms:
+            platform_nodes = _find_sdk_components(
+                os.path.join(ctx.env.PEBBLE_SDK_ROOT, platform), platform_check_nodes)
+            if len(platform_nodes) != len(platform_check_nodes):
+                invalid_platforms.append(platform)
+        for platform in invalid_platforms:
+            supported_platforms.remove(platform)
+        ctx.env.SDK_INSTALLED_PLATFORMS = list(supported_platforms)
+
     if has_rocky and 'aplite' in supported_platforms:
         supported_platforms.remove('aplite')
 
@@ -120,16 +216,21 @@ def append_to_attr(self, attr, new_values):
 
 
 def configure_libraries(ctx, libraries):
-    dependencies = libraries.keys()
+    dependencies = list(libraries.keys())
     lib_json = []
     lib_resources_json = {}
 
+    # Packages shared by several dependencies are only processed (and unpacked) once
+    seen_dependencies = set(dependencies)
     index = 0
     while index < len(dependencies):
         info, resources, additional_deps = process_package(ctx, dependencies[index])
         lib_json.append(info)
         lib_resources_json[dependencies[index]] = resources
-        dependencies.extend(additional_deps)
+        for dependency in additional_deps:
+            if dependency not in seen_dependencies:
+                seen_dependencies.add(dependency)
+                dependencies.append(dependency)
         index += 1
 
     # Store package.json info for each library and add resources to an environment variable for
@@ -179,12 +280,13 @@ def find_sdk_component(ctx, env, component):
     :param component: the SDK component being sought
     :return: the path to the SDK component being sought
     """
-    return (ctx.root.find_node(env.PEBBLE_SDK_PLATFORM).find_node(component) or
-            ctx.root.find_node(env.PEBBLE_SDK_COMMON).find_node(component))
+    platform_node = _get_cached_node(ctx, env.PEBBLE_SDK_PLATFORM)
+    common_node = _get_cached_node(ctx, env.PEBBLE_SDK_COMMON)
+    return platform_node.find_node(component) or common_node.find_node(component)
 
 
 def get_node_from_abspath(ctx, path):
-    return ctx.root.make_node(path)
+    return _get_cached_node(ctx, path, create=True)
 
 
 def get_target_platforms(ctx):
@@ -204,7 +306,8 @@ def get_target_platforms(ctx):
         ctx.fatal("No valid targetPlatforms specified in appinfo.json. Valid options are {}"
                   .format(supported_platforms))
 
-    ctx.env.TARGET_PLATFORMS = sorted([p.encode('utf-8') for p in target_platforms], reverse=True)
+    # platform names are ASCII; str() yields a native string on both Python 2 and 3
+    ctx.env.TARGET_PLATFORMS = sorted(map(str, target_platforms), reverse=True)
     return target_platforms
 
 
@@ -246,16 +349,16 @@ def process_package(ctx, package, root_lib_node=None):
         if libinfo_node is None:
             ctx.fatal("Missing package.json for {} library".format(str(package)))
         else:
-            if lib_node.find_node(ctx.env.LIB_DIR):
+            nested_lib_node = lib_node.find_node(ctx.env.LIB_DIR)
+            if nested_lib_node:
                 error_str = ("ERROR: Multiple versions of the same package are not supported by "
                              "the Pebble SDK due to namespace issues during linking. Package '{}' "
                              "contains the following duplicate and incompatible dependencies, "
                              "which may lead to additional build errors and/or unpredictable "
                              "runtime behavior:\n".format(package))
                 packages_str = ""
-                for package in lib_node.find_node(ctx.env.LIB_DIR).ant_glob('**/package.json'):
-                    with open(package.abspath()) as f:
-                        info = json.load(f)
+                for package in nested_lib_node.ant_glob('**/package.json'):
+                    info = _load_package_json(ctx, package.abspath())
                     if not dict(ctx.env.PROJECT_INFO).get('enableMultiJS', False):
                         if not 'pebble' in info:
                             continue
@@ -263,8 +366,7 @@ def process_package(ctx, package, root_lib_node=None):
                 if packages_str:
                     Logs.pprint("RED", error_str + packages_str)
 
-            with open(libinfo_node.abspath()) as f:
-                libinfo = json.load(f)
+            libinfo = _load_package_json(ctx, libinfo_node.abspath())
 
             if 'pebble' in libinfo:
                 if ctx.env.BUILD_TYPE == 'rocky':
@@ -272,7 +374,8 @@ def process_package(ctx, package, root_lib_node=None):
                               "projects. Please remove '{}' from the `dependencies` object in "
                               "package.json".format(libinfo['name']))
 
-                libinfo['path'] = lib_node.make_node('dist').path_from(ctx.path)
+                dist_dir_node = lib_node.make_node('dist')
+                libinfo['path'] = dist_dir_node.path_from(ctx.path)
                 if 'resources' in libinfo['pebble']:
                     if 'media' in libinfo['pebble']['resources']:
                         resources_json = libinfo['pebble']['resources']['media']
@@ -282,8 +385,13 @@ def process_package(ctx, package, root_lib_node=None):
                 if not dist_node:
                     ctx.fatal("Missing dist.zip file for {}. Are you sure this is a Pebble "
                               "library?".format(package))
-                lib_package = LibraryPackage(dist_node.abspath())
-                lib_package.unpack(libinfo['path'])
+                # Only extract the package if dist.zip or the extracted files have changed since it
+                # was last extracted
+                dist_path = dist_dir_node.abspath()
+                if not _is_library_unpacked(dist_node.abspath(), dist_path):
+                    lib_package = LibraryPackage(dist_node.abspath())
+                    lib_package.unpack(dist_path)
+                    open(os.path.join(dist_path, _UNPACKED_MARKER), 'w').close()
                 lib_js_node = lib_node.find_node('dist/js')
                 if lib_js_node:
                     libinfo['js_paths'] = [lib_js.path_from(ctx.path) for lib_js in
@@ -339,33 +447,35 @@ def validate_resource_not_larger_than(ctx, resource_file, dimensions=None, width
     if dimensions:
         width, height = dimensions
 
-    with open(resource_file, 'rb') as f:
-        if resource_file.endswith('.reso'):
-            reso = ResourceObject.load(resource_file)
-            if reso.definition.type == 'bitmap':
-                storage_format = reso.definition.storage_format
-            else:
-                storage_format = reso.definition.type
-
-            if storage_format == 'pbi':
-                resource_size = _get_pbi_size(reso.data)
-            elif storage_format == 'png':
-                resource_size = _get_png_size(reso.data[12:])
-            elif storage_format == 'raw':
-                try:
-                    assert reso.data[4:] == 'PDCI'
-                except AssertionError:
-                    ctx.fatal("Unsupported published resource type for {}".format(resource_file))
-                else:
-                    resource_size = _get_pdc_size(reso.data[4:])
+    if resource_file.endswith('.reso'):
+        reso = ResourceObject.load(resource_file)
+        if reso.definition.type == 'bitmap':
+            storage_format = reso.definition.storage_format
         else:
-            data = f.read(24)
-            if data[1:4] == 'PNG':
-                resource_size = _get_png_size(data[12:])
-            elif data[:4] == 'PDCI':
-                resource_size = _get_pdc_size(data[4:])
-            else:
+            storage_format = reso.definition.type
+
+        if storage_format == 'pbi':
+            resource_size = _get_pbi_size(reso.data)
+        elif storage_format == 'png':
+            resource_size = _get_png_size(reso.data, 12)
+        elif storage_format == 'raw':
+            try:
+                assert reso.data.startswith(_PDCI_MAGIC)
+            except AssertionError:
                 ctx.fatal("Unsupported published resource type for {}".format(resource_file))
+            else:
+                resource_size = _get_pdc_size(reso.data, 4)
+    else:
+        # Only the header is needed: 24 bytes covers the PNG signature and IHDR chunk, which is
+        # also more than enough for the PDC header
+        with open(resource_file, 'rb') as f:
+            data = f.read(24)
+        if data.startswith(_PNG_MAGIC):
+            resource_size = _get_png_size(data, 12)
+        elif data.startswith(_PDCI_MAGIC):
+            resource_size = _get_pdc_size(data, 4)
+        else:
+            ctx.fatal("Unsupported published resource type for {}".format(resource_file))
 
     if width and height:
         return resource_size <= (width, height)
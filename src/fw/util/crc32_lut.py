@@ -16,22 +16,30 @@
 
 from __future__ import print_function
 
+import sys
+import zlib
+from itertools import islice
+
+# zlib's CRC-32 uses this same reflected polynomial
 CRC_POLY = 0xEDB88320
 
 
 def crc_table(bits):
-    lookup_table = []
-    for i in xrange(2**bits):
-        rr = i * 16
-        for x in xrange(8):
-            rr = (rr >> 1) ^ (-(rr & 1) & CRC_POLY)
-        lookup_table.append(rr & 0xffffffff)
-    return lookup_table
-
-table = ['0x{:08x},'.format(entry) for entry in crc_table(4)]
-chunks = zip(*[iter(table)]*4)
-
-print('static const uint32_t s_lookup_table[] = {')
-for chunk in chunks:
-    print('  ' + ' '.join(chunk))
-print('};')
+    # Eight bit-serial reduction steps of the register are exactly one byte-wise CRC-32 update
+    # with a zero input byte, which zlib computes natively. zlib inverts the register before and
+    # after the update, so undo that on both sides.
+    return [~zlib.crc32(b'\x00', ~(i * 16) & 0xffffffff) & 0xffffffff for i in range(2**bits)]
+
+
+def chunked(iterable, size):
+    it = iter(iterable)
+    chunk = tuple(islice(it, size))
+    while chunk:
+        yield chunk
+        chunk = tuple(islice(it, size))
+
+entries = ('0x%08x,' % entry for entry in crc_table(4))
+
+sys.stdout.write('static const uint32_t s_lookup_table[] = {\n' +
+                 ''.join('  ' + ' '.join(chunk) + '\n' for chunk in chunked(entries, 4)) +
+                 '};\n')
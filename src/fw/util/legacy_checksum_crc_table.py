@@ -16,6 +16,8 @@
 
 from __future__ import print_function
 
+import sys
+
 CRC_POLY = 0x04C11DB7
 CRC_WIDTH = 32
 
@@ -32,7 +34,6 @@ def precompute_table(bits):
         lookup_table.append(rr & 0xffffffff)
     return lookup_table
 
-print('static const uint32_t s_lookup_table[] = {')
-for entry in precompute_table(4):
-    print('  0x{:08x},'.format(entry))
-print('};')
+sys.stdout.write('static const uint32_t s_lookup_table[] = {\n' +
+                 ''.join('  0x%08x,\n' % entry for entry in precompute_table(4)) +
+                 '};\n')
@@ -22,44 +22,38 @@ from accessory_imaging import AccessoryImaging
 import insert_firmware_descr
 
 
-def flash_firmware(tty, path, progress):
-    dev = AccessoryImaging(tty)
+def flash_firmware(dev, path, progress):
     image = insert_firmware_descr.insert_firmware_description_struct(path)
     dev.flash_image(image, dev.Frame.REGION_FW_SCRATCH, progress)
 
 
-def flash_prf(tty, path, progress):
-    dev = AccessoryImaging(tty)
+def flash_prf(dev, path, progress):
     image = insert_firmware_descr.insert_firmware_description_struct(path)
     dev.flash_image(image, dev.Frame.REGION_PRF, progress)
 
 
-def flash_resources(tty, path, progress):
-    dev = AccessoryImaging(tty)
+def flash_resources(dev, path, progress):
     with open(path, 'rb') as inf:
         image = inf.read()
     dev.flash_image(image, dev.Frame.REGION_RESOURCES, progress)
 
 
-def read_pfs(tty, path, progress):
-    dev = AccessoryImaging(tty)
+def read_pfs(dev, path, progress):
     with open(path, 'wb') as output_file:
-        data = dev.flash_read(dev.Frame.REGION_PFS, progress)
-        output_file.write("".join(data))
+        for chunk in dev.flash_read(dev.Frame.REGION_PFS, progress):
+            output_file.write(chunk)
 
 
-def write_pfs(tty, path, progress):
-    dev = AccessoryImaging(tty)
+def write_pfs(dev, path, progress):
     with open(path, 'rb') as input_file:
         data = input_file.read()
         dev.flash_image(data, dev.Frame.REGION_PFS, progress)
 
 
-def read_coredump(tty, path, progress):
-    dev = AccessoryImaging(tty)
+def read_coredump(dev, path, progress):
     with open(path, 'wb') as output_file:
-        data = dev.flash_read(dev.Frame.REGION_COREDUMP, progress)
-        output_file.write("".join(data))
+        for chunk in dev.flash_read(dev.Frame.REGION_COREDUMP, progress):
+            output_file.write(chunk)
 
 
 if __name__ == '__main__':
@@ -74,17 +68,18 @@ if __name__ == '__main__':
 
     args = parser.parse_args()
 
-    if args.type == 'prf':
-        flash_prf(args.tty, args.path, True)
-    elif args.type == 'firmware':
-        flash_firmware(args.tty, args.path, True)
-    elif args.type == 'resources':
-        flash_resources(args.tty, args.path, True)
-    elif args.type == 'read_pfs':
-        read_pfs(args.tty, args.path, True)
-    elif args.type == 'write_pfs':
-        write_pfs(args.tty, args.path, True)
-    elif args.type == 'read_coredump':
-        read_coredump(args.tty, args.path, True)
-    else:
-        assert False, 'This should never happen'
+    with AccessoryImaging(args.tty) as dev:
+        if args.type == 'prf':
+            flash_prf(dev, args.path, True)
+        elif args.type == 'firmware':
+            flash_firmware(dev, args.path, True)
+        elif args.type == 'resources':
+            flash_resources(dev, args.path, True)
+        elif args.type == 'read_pfs':
+            read_pfs(dev, args.path, True)
+        elif args.type == 'write_pfs':
+            write_pfs(dev, args.path, True)
+        elif args.type == 'read_coredump':
+            read_coredump(dev, args.path, True)
+        else:
+            assert False, 'This should never happen'
@@ -12,20 +12,43 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from __future__ import print_function
+
+import os
 import struct
 import time
 from binascii import crc32
-from random import randint
 
 from hdlc import HDLCDecoder, hdlc_encode_data
 from serial_port_wrapper import SerialPortWrapper
 
+try:
+    # timeouts use a monotonic clock so that wall clock changes can't cut them short or stall them
+    from time import monotonic
+except ImportError:
+    # Py2 support
+    from time import time as monotonic
+
 
-CRC_RESIDUE = crc32('\0\0\0\0')
+CRC_RESIDUE = crc32(b'\0\0\0\0')
 READ_TIMEOUT = 1
+COMMAND_RETRIES = 5
+COMMAND_RETRY_BACKOFF = 0.05
+ERASE_POLL_INTERVAL_MIN = 0.05
+ERASE_POLL_INTERVAL_MAX = 0.5
 ACCESSORY_CONSOLE_BAUD_RATE = 115200
 ACCESSORY_IMAGING_BAUD_RATE = 921600
 
+# compiled layouts of the frame header and the request / response payloads
+FRAME_HEADER_STRUCT = struct.Struct('<BB')                 # flags, opcode
+CRC_STRUCT = struct.Struct('<I')
+REGION_STRUCT = struct.Struct('<B')
+ADDR_STRUCT = struct.Struct('<I')
+ADDR_LENGTH_STRUCT = struct.Struct('<II')
+ADDR_LENGTH_CRC_STRUCT = struct.Struct('<III')
+ADDR_LENGTH_COMPLETE_STRUCT = struct.Struct('<IIB')
+REGION_ADDR_LENGTH_STRUCT = struct.Struct('<BII')
+
 
 class AccessoryImagingError(Exception):
     pass
@@ -57,7 +80,8 @@ class AccessoryImaging(object):
         FLASH_READ_FLAG_ALL_SAME = (1 << 0)
 
         def __init__(self, raw_data):
-            self._data = raw_data
+            # bytearray indexing yields ints on both Python 2 and 3
+            self._data = bytearray(raw_data)
 
         def __repr__(self):
             if self.is_valid():
@@ -72,13 +96,13 @@ class AccessoryImaging(object):
             return self._data and len(self._data) >= 6 and crc32(self._data) == CRC_RESIDUE
 
         def flag_is_server(self):
-            return bool(ord(self._data[0]) & self.FLAG_IS_SERVER)
+            return bool(self._data[0] & self.FLAG_IS_SERVER)
 
         def flag_version(self):
-            return (ord(self._data[0]) & self.FLAG_VERSION) >> 1
+            return (self._data[0] & self.FLAG_VERSION) >> 1
 
         def get_opcode(self):
-            return ord(self._data[1])
+            return self._data[1]
 
         def get_payload(self):
             return self._data[2:-4]
@@ -87,20 +111,29 @@ class AccessoryImaging(object):
         def __init__(self, addr, data):
             self._addr = addr
             self._data = data
-            self._crc = crc32(self._data) & 0xFFFFFFFF
+            # the request payloads never change, so only pack them once
+            self._addr_payload = ADDR_STRUCT.pack(addr)
+            self._crc_payload = ADDR_LENGTH_STRUCT.pack(addr, len(data))
+            # computed on first use so that preparing the blocks doesn't delay the first write
+            self._crc = None
             self._validated = False
 
+        def get_crc(self):
+            if self._crc is None:
+                self._crc = crc32(self._data) & 0xFFFFFFFF
+            return self._crc
+
         def get_write_payload(self):
-            return struct.pack('<I', self._addr) + self._data
+            # returned in pieces which _send_frame() copies straight into the frame
+            return self._addr_payload, self._data
 
         def get_crc_payload(self):
-            return struct.pack('<II', self._addr, len(self._data))
+            return self._crc_payload
 
-        def validate(self, raw_response):
-            addr, length, crc = struct.unpack('<III', raw_response)
+        def validate(self, addr, length, crc):
             # check if this response completely includes this block
             if addr <= self._addr and (addr + length) >= self._addr + len(self._data):
-                self._validated = (crc == self._crc)
+                self._validated = (crc == self.get_crc())
 
         def is_validated(self):
             return self._validated
@@ -113,15 +146,34 @@ class AccessoryImaging(object):
         self._serial = SerialPortWrapper(tty, None, ACCESSORY_CONSOLE_BAUD_RATE)
         self._hdlc_decoder = HDLCDecoder()
         self._server_version = 0
-
-    def _send_frame(self, opcode, payload):
-        data = struct.pack('<BB', 0, opcode)
-        data += payload
-        data += struct.pack('<I', crc32(data) & 0xFFFFFFFF)
-        self._serial.write_fast(hdlc_encode_data(data))
+        # reused by _send_frame() to assemble frames without intermediate copies
+        self._frame_buffer = bytearray()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self._serial.close()
+
+    def _send_frame(self, opcode, *payload_parts):
+        # frame layout: flags, opcode, payload, crc32 of everything before it
+        crc_offset = 2 + sum(len(x) for x in payload_parts)
+        if len(self._frame_buffer) < crc_offset + 4:
+            self._frame_buffer = bytearray(crc_offset + 4)
+        frame = memoryview(self._frame_buffer)[:crc_offset + 4]
+        FRAME_HEADER_STRUCT.pack_into(frame, 0, 0, opcode)
+        offset = 2
+        for part in payload_parts:
+            frame[offset:offset + len(part)] = part
+            offset += len(part)
+        CRC_STRUCT.pack_into(frame, crc_offset, crc32(frame[:crc_offset]) & 0xFFFFFFFF)
+        self._serial.write_fast(hdlc_encode_data(frame))
 
     def _read_frame(self):
-        start_time = time.time()
+        deadline = monotonic() + READ_TIMEOUT
         while True:
             # process any queued frames
             for frame_data in iter(self._hdlc_decoder.get_frame, None):
@@ -129,12 +181,14 @@ class AccessoryImaging(object):
                 if frame.is_valid() and frame.flag_is_server():
                     self._server_version = frame.flag_version()
                     return frame
-            if (time.time() - start_time) > READ_TIMEOUT:
+            # check on every pass so that a stream of bytes which never forms a valid server frame
+            # still times out
+            if monotonic() > deadline:
                 return None
             self._hdlc_decoder.write(self._serial.read(0.001))
 
-    def _command_and_response(self, opcode, payload=''):
-        retries = 5
+    def _command_and_response(self, opcode, payload=b''):
+        retries = COMMAND_RETRIES
         while True:
             self._send_frame(opcode, payload)
             frame = self._read_frame()
@@ -143,36 +197,39 @@ class AccessoryImaging(object):
                     raise AccessoryImagingError('ERROR: Got unexpected response ({:#x}, {})'
                                                 .format(opcode, frame))
                 break
-            elif --retries == 0:
+            retries -= 1
+            if retries == 0:
                 raise AccessoryImagingError('ERROR: Watch did not respond to request ({:#x})'
                                             .format(opcode))
+            # back off a little more after each miss rather than flooding the watch with frames
+            time.sleep(COMMAND_RETRY_BACKOFF * (COMMAND_RETRIES - retries))
         return frame.get_payload()
 
     def _get_prompt(self):
-        timeout = time.time() + 5
+        timeout = monotonic() + 5
         while True:
             # we could be in stop mode, so send a few
-            self._serial.write('\x03')
-            self._serial.write('\x03')
-            self._serial.write('\x03')
+            self._serial.write(b'\x03')
+            self._serial.write(b'\x03')
+            self._serial.write(b'\x03')
             read_data = self._serial.read()
-            if read_data and read_data[-1] == '>':
+            if read_data and read_data[-1:] == b'>':
                 break
             time.sleep(0.5)
-            if time.time() > timeout:
+            if monotonic() > timeout:
                 raise AccessoryImagingError('ERROR: Timed-out connecting to the watch!')
 
     def start(self):
         self._serial.s.baudrate = ACCESSORY_CONSOLE_BAUD_RATE
         self._get_prompt()
-        self._serial.write_fast('accessory imaging start\r\n')
+        self._serial.write_fast(b'accessory imaging start\r\n')
         self._serial.read()
         self._serial.s.baudrate = ACCESSORY_IMAGING_BAUD_RATE
         if self._server_version >= 1:
             self.Frame.MAX_DATA_LENGTH = 2048
 
     def ping(self):
-        payload = ''.join(chr(randint(0, 255)) for _ in range(10))
+        payload = os.urandom(10)
         if self._command_and_response(self.Frame.OPCODE_PING, payload) != payload:
             raise AccessoryImagingError('ERROR: Invalid ping payload in response!')
 
@@ -188,50 +245,54 @@ class AccessoryImaging(object):
             # These regions require >= v1
             if self._server_version < 1:
                 raise AccessoryImagingError('ERROR: Server does not support this region')
-        payload = struct.pack('<B', region)
+        payload = REGION_STRUCT.pack(region)
         response = self._command_and_response(self.Frame.OPCODE_FLASH_GEOMETRY, payload)
-        response_region, addr, length = struct.unpack('<BII', response)
+        response_region, addr, length = REGION_ADDR_LENGTH_STRUCT.unpack(response)
         if response_region != region or length == 0:
             raise AccessoryImagingError('ERROR: Did not get region information ({:#x})'
                                         .format(region))
         return addr, length
 
     def flash_erase(self, addr, length):
-        payload = struct.pack('<II', addr, length)
+        payload = ADDR_LENGTH_STRUCT.pack(addr, length)
+        # the server only reports completion once the erase has finished and the sectors read back
+        # as erased, so poll quickly at first and back off for longer erases
+        poll_interval = ERASE_POLL_INTERVAL_MIN
         while True:
             response = self._command_and_response(self.Frame.OPCODE_FLASH_ERASE, payload)
-            response_addr, response_length, response_complete = struct.unpack('<IIB', response)
+            response_addr, response_length, response_complete = \
+                ADDR_LENGTH_COMPLETE_STRUCT.unpack(response)
             if response_addr != addr or response_length != length:
                 raise AccessoryImagingError('ERROR: Got invalid response (expected '
                                             '[{:#x},{:#x}], got [{:#x},{:#x}])'
                                             .format(addr, length, response_addr, response_length))
             elif response_complete != 0:
                 break
-            time.sleep(0.5)
+            time.sleep(poll_interval)
+            poll_interval = min(poll_interval * 1.5, ERASE_POLL_INTERVAL_MAX)
+        # give the accessory time to settle after the erase before writing to it
         time.sleep(1)
 
     def flash_write(self, block):
-        self._send_frame(self.Frame.OPCODE_FLASH_WRITE, block.get_write_payload())
+        self._send_frame(self.Frame.OPCODE_FLASH_WRITE, *block.get_write_payload())
 
     def flash_crc(self, blocks):
-        payload = ''.join(x.get_crc_payload() for x in blocks)
+        payload = b''.join([x.get_crc_payload() for x in blocks])
         response = self._command_and_response(self.Frame.OPCODE_FLASH_CRC, payload)
-        response_fmt = '<III'
-        entry_size = struct.calcsize(response_fmt)
+        entry_size = ADDR_LENGTH_CRC_STRUCT.size
         num_entries = len(response) // entry_size
         if len(response) % entry_size != 0:
             raise AccessoryImagingError('ERROR: Invalid response length ({})'.format(len(response)))
         elif num_entries != len(blocks):
             raise AccessoryImagingError('ERROR: Invalid number of response entries ({})'
                                         .format(num_entries))
-        responses = [response[i:i+entry_size] for i in xrange(0, len(response), entry_size)]
-        assert len(responses) == len(blocks)
-        return responses
+        unpack_from = ADDR_LENGTH_CRC_STRUCT.unpack_from
+        return [unpack_from(response, i) for i in range(0, len(response), entry_size)]
 
     def flash_finalize(self, region):
-        payload = struct.pack('<B', region)
+        payload = REGION_STRUCT.pack(region)
         response = self._command_and_response(self.Frame.OPCODE_FLASH_FINALIZE, payload)
-        response_region = struct.unpack('<B', response)[0]
+        response_region = REGION_STRUCT.unpack(response)[0]
         if response_region != region:
             raise AccessoryImagingError('ERROR: Did not get correct region ({:#x})'.format(region))
 
@@ -250,19 +311,18 @@ class AccessoryImaging(object):
         if progress:
             print('Reading...')
 
-        read_bytes = []
         last_percent = 0
-        for offset in xrange(0, length, self.Frame.MAX_DATA_LENGTH):
+        for offset in range(0, length, self.Frame.MAX_DATA_LENGTH):
             chunk_length = min(self.Frame.MAX_DATA_LENGTH, length - offset)
-            data = struct.pack('<II', offset + addr, chunk_length)
+            data = ADDR_LENGTH_STRUCT.pack(offset + addr, chunk_length)
             response = self._command_and_response(self.Frame.OPCODE_FLASH_READ, payload=data)
             #  the first byte of the response is the flags (0th bit: repeat the single data byte)
-            if bool(ord(response[0]) & self.Frame.FLASH_READ_FLAG_ALL_SAME):
+            if bool(response[0] & self.Frame.FLASH_READ_FLAG_ALL_SAME):
                 if len(response) != 2:
                     raise AccessoryImagingError('ERROR: Invalid flash read response')
-                read_bytes.extend(response[1] * chunk_length)
+                yield bytes(response[1:2]) * chunk_length
             else:
-                read_bytes.extend(response[1:])
+                yield response[1:]
             if progress:
                 # don't spam the progress (only every 5%)
                 percent = (offset * 100) // length
@@ -276,8 +336,6 @@ class AccessoryImaging(object):
         if progress:
             print('Done!')
 
-        return read_bytes
-
     def flash_image(self, image, region, progress):
         if progress:
             print('Connecting...')
@@ -296,38 +354,47 @@ class AccessoryImaging(object):
         total_blocks = []
         # the block size should be as big as possible, but we need to leave 4 bytes for the address
         block_size = self.Frame.MAX_DATA_LENGTH - 4
-        for offset in xrange(0, len(image), block_size):
-            total_blocks.append(self.FlashBlock(addr + offset, image[offset:offset+block_size]))
+        # the blocks reference the image rather than each holding a copy of their slice
+        image_view = memoryview(image)
+        for offset in range(0, len(image), block_size):
+            total_blocks.append(self.FlashBlock(addr + offset,
+                                                image_view[offset:offset+block_size]))
 
         if progress:
             print('Writing...')
         num_total = len(total_blocks)
+        num_validated = 0
         num_errors = 0
-        pending_blocks = [x for x in total_blocks if not x.is_validated()]
+        last_percent = 0
+        pending_blocks = total_blocks
         while len(pending_blocks) > 0:
             # We will split up the outstanding blocks into packets which should be as big as
             # possible, but are limited by the fact that the flash CRC response is 12 bytes per
             # block.
             packet_size = self.Frame.MAX_DATA_LENGTH // 12
-            packets = []
-            for i in xrange(0, len(pending_blocks), packet_size):
-                packets += [pending_blocks[i:i+packet_size]]
-            for packet in packets:
+            failed_blocks = []
+            for i in range(0, len(pending_blocks), packet_size):
+                packet = pending_blocks[i:i+packet_size]
                 # write each of the blocks
                 for block in packet:
                     self.flash_write(block)
 
-                # CRC each of the blocks
+                # CRC each of the blocks, collecting the ones which need to be written again
                 crc_results = self.flash_crc(packet)
                 for block, result in zip(packet, crc_results):
-                    block.validate(result)
+                    block.validate(*result)
+                packet_failures = [x for x in packet if not x.is_validated()]
+                failed_blocks += packet_failures
+                num_validated += len(packet) - len(packet_failures)
 
-                # update the pending blocks
-                pending_blocks = [x for x in total_blocks if not x.is_validated()]
                 if progress:
-                    percent = ((num_total - len(pending_blocks)) * 100) // num_total
-                    num_errors += len([x for x in packet if not x.is_validated()])
-                    print('{}% of blocks written ({} errors)'.format(percent, num_errors))
+                    # don't spam the progress (only every 5%, and once everything is written)
+                    percent = (num_validated * 100) // num_total
+                    num_errors += len(packet_failures)
+                    if percent >= last_percent + 5 or num_validated == num_total:
+                        print('{}% of blocks written ({} errors)'.format(percent, num_errors))
+                        last_percent = percent
+            pending_blocks = failed_blocks
 
         self.flash_finalize(region)
         if region == self.Frame.REGION_FW_SCRATCH:
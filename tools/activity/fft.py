@@ -24,12 +24,16 @@
 #  method of kraepelin_algorithm.c
 ##################################################################################################
 
+from __future__ import print_function
+
 import argparse
 import os
 import sys
 import logging
 import math
 
+import numpy as np
+
 
 ###########################################################################################
 g_walk_10_steps = [
@@ -210,6 +214,47 @@ g_walk_10_steps = [
 
 ##################################################################################################
 def real_value_fft(x):
+    """ Real value FFT, returning its outputs in the same order as real_value_fft_radix2():
+        [Re(0), Re(1), ..., Re(N/2), Im(N/2-1), ..., Im(1)]
+
+    This uses numpy's native FFT; real_value_fft_radix2() is the step-by-step version of the
+    algorithm used by the firmware.
+    """
+
+    # Make sure we have a power of 2 length input
+    n = len(x)
+    m = int(math.log(n, 2))
+    if (math.pow(2, m) != n):
+        raise RuntimeError("Length must be a power of 2")
+
+    spectrum = np.fft.rfft(np.asarray(x, dtype=np.float64))
+    result = np.empty(n)
+    result[:n // 2 + 1] = spectrum.real
+    result[n // 2 + 1:] = spectrum.imag[n // 2 - 1:0:-1]
+    return result.tolist()
+
+
+##################################################################################################
+# Twiddle factor tables used by real_value_fft_radix2(), keyed by butterfly length
+g_twiddle_factors = {}
+
+
+def _twiddle_factors(n1):
+    """ Returns (cos, sin) tables of the twiddle angles j * 2 * pi / n1 for j in 0 .. n1/4 - 1.
+    Each stage of the FFT uses the same table for all of its butterflies, and repeated transforms
+    of the same length reuse it as well.
+    """
+    tables = g_twiddle_factors.get(n1)
+    if tables is None:
+        e = 2 * math.pi / n1
+        angles = [j * e for j in range(n1 // 4)]
+        tables = ([math.cos(a) for a in angles], [math.sin(a) for a in angles])
+        g_twiddle_factors[n1] = tables
+    return tables
+
+
+##################################################################################################
+def real_value_fft_radix2(x):
     """ Real value FFT as described in Appendix of:
     "Real-valued Fast Fourier Transform Algorithm", from IEEE Transactions on Acoustics, Speech,
     and Signal Processing, Vol. ASSP-35, No. 6, June 1987
@@ -233,10 +278,10 @@ def real_value_fft(x):
             xt = x[j]
             x[j] = x[i]
             x[i] = xt
-        k = n/2
+        k = n // 2
         while (k < j):
             j = j - k
-            k = k / 2
+            k = k // 2
         j = j + k
 
     # ---------------------------------------------------------------------------------
@@ -253,22 +298,20 @@ def real_value_fft(x):
         n4 = n2
         n2 = 2 * n4
         n1 = 2 * n2
-        e = 2 * math.pi / n1
+        cos_table, sin_table = _twiddle_factors(n1)
         for i in range(1, n+1, n1):
             xt = x[i]
             x[i] = xt + x[i + n2]
             x[i + n2] = xt - x[i + n2]
             x[i + n4 + n2] = -x[i + n4 + n2]
 
-            a = e
-            for j in range(1, n4 - 1):
+            for j in range(1, n4):
                 i1 = i + j
                 i2 = i - j + n2
                 i3 = i + j + n2
                 i4 = i - j + n1
-                cc = math.cos(a)
-                ss = math.sin(a)
-                a = a + e
+                cc = cos_table[j]
+                ss = sin_table[j]
                 t1 = x[i3] * cc + x[i4] * ss
                 t2 = x[i3] * ss - x[i4] * cc
                 x[i4] = x[i2] - t2
@@ -286,22 +329,14 @@ def compute_magnitude(x):
 
         This method returns the magnitudes. The magnitude of term i is sqrt(Re(i)**2 + Im(i)**2)
     """
-    result = []
+    x = np.asarray(x, dtype=np.float64)
     n = len(x)
-    real_idx = 0
-    im_idx = n - 1
-
-    result.append(x[real_idx])
-    real_idx += 1
+    result = np.empty(n // 2 + 1)
 
-    while real_idx <= n/2 - 1:
-        mag = (x[real_idx]**2 + x[im_idx]**2) ** 0.5
-        result.append(mag)
-        real_idx += 1
-        im_idx -= 1
-
-    result.append(x[real_idx])
-    return result
+    result[0] = x[0]
+    result[1:n // 2] = np.hypot(x[1:n // 2], x[n - 1:n // 2:-1])
+    result[n // 2] = x[n // 2]
+    return result.tolist()
 
 
 ###################################################################################################
@@ -310,12 +345,12 @@ def apply_gausian(x, width=0.1):
     """
     result = []
     n = len(x)
-    mid = float(n/2)
+    mid = float(n // 2)
     denominator = n**2 * width
 
     for i in range(len(x)):
-        print i-mid, (i-mid)**2,  -1 * (i - mid)**2/denominator, \
-              math.exp(-1 * (i - mid)**2/denominator)
+        print(i-mid, (i-mid)**2,  -1 * (i - mid)**2/denominator,
+              math.exp(-1 * (i - mid)**2/denominator))
         g = math.exp(-1 * (i - mid)**2/denominator)
         result.append(g * x[i])
 
@@ -332,14 +367,14 @@ def print_graph(x):
     min_value = -extent
 
     for i in range(len(x)):
-        print "%4d:  %10.3f: " % (i, x[i]),
+        print("%4d:  %10.3f: " % (i, x[i]), end=' ')
         position = int((x[i] - min_value) * 80 / scale)
         if position < 40:
-            print ' ' * position,
-            print '*' * (40 - position)
+            print(' ' * position, end=' ')
+            print('*' * (40 - position))
         else:
-            print ' ' * 40,
-            print '*' * (position - 40)
+            print(' ' * 40, end=' ')
+            print('*' * (position - 40))
 
 
 ###################################################################################################
@@ -360,12 +395,12 @@ if __name__ == '__main__':
     if 0:
         input_len = 128
         input = [1 for x in range(input_len)]
-        print "\n############ INPUT ######################"
+        print("\n############ INPUT ######################")
         print_graph(input)
 
         result = real_value_fft(input)
 
-        print "\n############ RESULT ######################"
+        print("\n############ RESULT ######################")
         print_graph(result)
 
     # -------------------------------------------------------------------------------------
@@ -374,19 +409,19 @@ if __name__ == '__main__':
         input_len = 128
         freq = 7
         input = [math.cos(float(x)/input_len * freq * 2 * math.pi) for x in range(input_len)]
-        print "\n############ INPUT ######################"
+        print("\n############ INPUT ######################")
         print_graph(input)
 
-        print "\n############ GAUSIAN OF INPUT ############"
+        print("\n############ GAUSIAN OF INPUT ############")
         # input = apply_gausian(input, 0.1)
         print_graph(input)
 
         result = real_value_fft(input)
 
-        print "\n############ REAL, IMAG ######################"
+        print("\n############ REAL, IMAG ######################")
         print_graph(result)
 
-        print "\n############ MAGNITUDE ######################"
+        print("\n############ MAGNITUDE ######################")
         mag = compute_magnitude(result)
         print_graph(mag)
 
@@ -394,45 +429,30 @@ if __name__ == '__main__':
     # Step data
     if 1:
         input_len = 128
-        raw_input = g_walk_10_steps[0:input_len]
+        raw_input = np.asarray(g_walk_10_steps[0:input_len])
 
-        x_data = [x for x, y, z in raw_input]
-        x_mean = sum(x_data) / len(x_data)
-        x_data = [x - x_mean for x in x_data]
+        # remove the (integer) mean of each axis
+        x_data, y_data, z_data = (raw_input - raw_input.sum(axis=0) // len(raw_input)).T
 
-        y_data = [y for x, y, z in raw_input]
-        y_mean = sum(y_data) / len(y_data)
-        y_data = [y - y_mean for y in y_data]
-
-        z_data = [z for x, y, z in raw_input]
-        z_mean = sum(z_data) / len(z_data)
-        z_data = [z - z_mean for z in z_data]
-
-        print "\n############ X ######################"
+        print("\n############ X ######################")
         print_graph(x_data)
-        print "\n############ Y ######################"
+        print("\n############ Y ######################")
         print_graph(y_data)
-        print "\n############ Z ######################"
+        print("\n############ Z ######################")
         print_graph(z_data)
 
-        input = []
-        for (x, y, z) in raw_input:
-            mag = x**2 + y**2 + z**2
-            mag = mag ** 0.5
-            input.append(mag)
-
-        mean_mag = sum(input) / len(input)
-        input = [x - mean_mag for x in input]
+        mag = np.linalg.norm(raw_input, axis=1)
+        input = mag - mag.mean()
 
-        print "\n############ INPUT ######################"
+        print("\n############ INPUT ######################")
         # input = apply_gausian(input)
         print_graph(input)
 
         result = real_value_fft(input)
 
-        print "\n############ REAL, IMAG ######################"
+        print("\n############ REAL, IMAG ######################")
         print_graph(result)
 
-        print "\n############ MAGNITUDE ######################"
+        print("\n############ MAGNITUDE ######################")
         mag = compute_magnitude(result)
         print_graph(mag)
@@ -56,23 +56,24 @@ if __name__ == '__main__':
         level = logging.DEBUG
     logging.basicConfig(level=level)
 
-    sample_format = '<BBB'
-    header_format = '<HHIIH'
+    sample_struct = struct.Struct('<BBB')
+    header_struct = struct.Struct('<HHIIH')
 
     num_samples = 10
-    blob = struct.pack(
-        header_format,
+    blob = bytearray(header_struct.size + num_samples * sample_struct.size)
+    header_struct.pack_into(
+        blob, 0,
         1,
-        struct.calcsize(header_format) + num_samples * struct.calcsize(sample_format),
+        len(blob),
         int(time.time()),
         int(time.time()),
         num_samples)
 
     for i in range(num_samples):
-        blob += struct.pack(sample_format,
-                            30 + (i % 5),
-                            4,
-                            50 + (i % 4))
+        sample_struct.pack_into(blob, header_struct.size + i * sample_struct.size,
+                                30 + (i % 5),
+                                4,
+                                50 + (i % 4))
 
     with open('health_blob.bin', "w") as out:
         out.write(blob)
@@ -21,7 +21,17 @@ sys.path.append(os.path.dirname(__file__))
 import analyze_static_memory_usage
 from binutils import nm_generator, analyze_elf
 
+# Cleaned up paths, keyed by the original path. Most symbols share a handful of source files, so
+# each distinct path only needs to be cleaned up once.
+_cleanup_path_cache = {}
+
 def cleanup_path(f):
+    cleaned = _cleanup_path_cache.get(f)
+    if cleaned is None:
+        cleaned = _cleanup_path_cache[f] = _cleanup_path(f)
+    return cleaned
+
+def _cleanup_path(f):
     f = os.path.normpath(f)
 
     # Check for .c.3.o style suffixes and strip them back to just .c
@@ -64,60 +74,69 @@ def analyze_map(map_file, sections):
         return
 
     text_section = sections['t']
+    remove_unknown_entry = text_section.remove_unknown_entry
+    add_entry = text_section.add_entry
 
-    def line_generator(map_file):
-        with open(map_file, 'r') as f:
-            for line in f:
-                yield line
-
-    lines = line_generator(map_file)
-    for line in lines:
-        if line.startswith('Linker script and memory map'):
-            break
-
-    for line in lines:
-        if line.startswith('.text'):
-            break
+    with open(map_file, 'r') as lines:
+        for line in lines:
+            if line.startswith('Linker script and memory map'):
+                break
 
-    # We're looking for groups of lines like the following...
-    #
-    # .text.do_tap_handle
-    #            0x0000000008010e08       0x28 src/fw/applib/accel_service.c.3.o
+        for line in lines:
+            if line.startswith('.text'):
+                break
 
-    symbol_pattern = re.compile(r""" \.?[^\.\s]*\.(\S+)""")
-    for line in lines:
-        match = symbol_pattern.match(line.rstrip())
-        if match is None:
-            continue
+        # We're looking for groups of lines like the following...
+        #
+        # .text.do_tap_handle
+        #            0x0000000008010e08       0x28 src/fw/applib/accel_service.c.3.o
+
+        symbol_match = re.compile(r""" \.?[^\.\s]*\.(\S+)""").match
+        in_text = True
+        for line in lines:
+            # every symbol line starts with a space, so skip the regex for everything else
+            if not line.startswith(' '):
+                if line.startswith('.'):
+                    # a new output section has started; only match symbols in the .text ones so
+                    # that a data or bss entry can't give a .text symbol the wrong file
+                    in_text = line.startswith('.text')
+                continue
+            if not in_text:
+                continue
+            match = symbol_match(line)
+            if match is None:
+                continue
 
-        symbol = match.group(1)
+            symbol = match.group(1)
 
-        line = lines.next()
+            line = next(lines, '')
 
-        cols = line.split()
-        if len(cols) < 3:
-            continue
+            cols = line.split()
+            if len(cols) < 3:
+                continue
 
-        filename = cols[2]
+            filename = cols[2]
 
-        symbol_with_unknown_file = text_section.remove_unknown_entry(symbol)
-        if symbol_with_unknown_file is None:
-            continue
-        text_section.add_entry(symbol, filename, symbol_with_unknown_file.size)
+            symbol_with_unknown_file = remove_unknown_entry(symbol)
+            if symbol_with_unknown_file is None:
+                continue
+            add_entry(symbol, filename, symbol_with_unknown_file.size)
 
 def analyze_libs(root_directory, sections, use_fast):
+    # Bind the per-section methods once rather than looking them up for every symbol
+    remove_unknown_entry = {k: s.remove_unknown_entry for k, s in sections.iteritems()}
+    add_entry = {k: s.add_entry for k, s in sections.iteritems()}
+
     def analyze_lib(lib_filename):
         for (_, section, symbol_name, filename, line, size) in nm_generator(lib_filename, use_fast):
-            if not section in sections:
+            if not section in remove_unknown_entry:
                 continue
 
-            section_info = sections[section]
-
-            symbol_with_unknown_file = section_info.remove_unknown_entry(symbol_name)
+            symbol_with_unknown_file = remove_unknown_entry[section](symbol_name)
             if symbol_with_unknown_file is None:
                 continue
 
-            section_info.add_entry(symbol_name, lib_filename, size)
+            add_entry[section](symbol_name, lib_filename, size)
 
     for (dirpath, dirnames, filenames) in os.walk(root_directory):
         for f in filenames:
@@ -151,23 +170,21 @@ def print_groups(text_section, verbose):
             self.total_size += f.size
             self.files.append(f)
 
+    # One anchored alternation in mapping order, so the first matching prefix still wins
+    mapping_match = re.compile('|'.join('(%s)' % re.escape(prefix)
+                                        for prefix, _ in mappings)).match
+    group_names = [value for _, value in mappings]
+
     group_sizes = {}
 
     for f in text_section.get_files():
-        found = False
-
-        for prefix, value in mappings:
-            if f.filename.startswith(prefix):
-                if not value in group_sizes:
-                    group_sizes[value] = Group(f.filename)
-                group_sizes[value].add_file(f)
-                found = True
-                break
+        match = mapping_match(f.filename)
+        value = group_names[match.lastindex - 1] if match else 'Unknown'
 
-        if not found:
-            if not 'Unknown' in group_sizes:
-                group_sizes['Unknown'] = Group(f.filename)
-            group_sizes['Unknown'].add_file(f)
+        group = group_sizes.get(value)
+        if group is None:
+            group = group_sizes[value] = Group(f.filename)
+        group.add_file(f)
 
     sorted_items = sorted(group_sizes.iteritems(), key=lambda x: -x[1].total_size)
     for group_name, group in sorted_items:
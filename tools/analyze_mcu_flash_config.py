@@ -17,6 +17,20 @@ import os.path
 import sh
 
 
+# Sets of symbol names per library path, shared by all Config instances so that
+# each library is only run through nm once:
+_lib_symbols_cache = {}
+
+
+def _extract_symbols(object_path):
+    symbols = _lib_symbols_cache.get(object_path)
+    if symbols is None:
+        nm = binutils.nm_generator(object_path)
+        symbols = {s for _, _, s, _, _, _ in nm}
+        _lib_symbols_cache[object_path] = symbols
+    return symbols
+
+
 class Config(object):
     def abs_path(self, script_relative_path):
         return os.path.join(
@@ -35,12 +49,7 @@ class Config(object):
     def lib_symbols(self):
         # Array of tuples (use_fast, lib_path):
         lib_paths = self.lib_paths()
-
-        def extract_symbols(object_path):
-            nm = binutils.nm_generator(object_path)
-            return set([s for _, _, s, _, _, _ in nm])
-
-        return {path: extract_symbols(path)
+        return {path: _extract_symbols(path)
                 for path in lib_paths}
 
     def memory_region_to_analyze(self):
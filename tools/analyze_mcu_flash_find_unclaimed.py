@@ -13,12 +13,15 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from __future__ import print_function
 
 from analyze_mcu_flash_config import *
 
 import argparse
 import binutils
+import bisect
 import sh
+import sys
 
 
 def contains(a, b):
@@ -27,35 +30,40 @@ def contains(a, b):
 
 
 def claim(c, unclaimed_regions, symbol):
-    """ Removes region (c_start, c_end) from the set of unclaimed_regions
-        Return True if the region was sucessfully removed, False if it was
-        already claimed.
+    """ Removes region (c_start, c_end) from the sorted list of
+        unclaimed_regions. Return True if the region was sucessfully removed,
+        False if it was already claimed.
 
     """
     if c[0] == c[1]:
         raise Exception("Invalid region: 0 size! %s" % c)
 
-    for u in unclaimed_regions:
-        if contains(u, c):
-            unclaimed_regions.remove(u)
-
-            # Defensive programming:
-            if c[0] < u[0]:
-                raise Exception("WTF! %s %s" % (u, c))
-            if c[1] > u[1]:
-                raise Exception("WTF! %s %s" % (u, c))
-
-            if u[0] != c[0]:
-                # Lower edge of the claimed region does not overlap with
-                # the unclaimed region. Add a piece of unclaimed padding:
-                unclaimed_regions.add((u[0], c[0]))
-            if u[1] != c[1]:
-                # Upper edge of the claimed region does not overlap with
-                # the unclaimed region. Add a piece of unclaimed padding:
-                unclaimed_regions.add((c[1], u[1]))
-            return True
-
-    print "Warning: doubly claimed %s, 0x%08x - 0x%08x?" % (symbol, c[0], c[1])
+    # The unclaimed regions never overlap, so the only one that can contain c
+    # is the last one starting at or before it:
+    i = bisect.bisect_right(unclaimed_regions, (c[0], sys.maxsize)) - 1
+    if i >= 0 and contains(unclaimed_regions[i], c):
+        u = unclaimed_regions[i]
+
+        # Defensive programming:
+        if c[0] < u[0]:
+            raise Exception("WTF! %s %s" % (u, c))
+        if c[1] > u[1]:
+            raise Exception("WTF! %s %s" % (u, c))
+
+        padding = []
+        if u[0] != c[0]:
+            # Lower edge of the claimed region does not overlap with
+            # the unclaimed region. Add a piece of unclaimed padding:
+            padding.append((u[0], c[0]))
+        if u[1] != c[1]:
+            # Upper edge of the claimed region does not overlap with
+            # the unclaimed region. Add a piece of unclaimed padding:
+            padding.append((c[1], u[1]))
+        # Replacing u with its padding in place keeps the list sorted:
+        unclaimed_regions[i:i + 1] = padding
+        return True
+
+    print("Warning: doubly claimed %s, 0x%08x - 0x%08x?" % (symbol, c[0], c[1]))
     return False
 
 
@@ -77,12 +85,12 @@ if (__name__ == '__main__'):
     if not elf_file:
         elf_file = config.default_elf_abs_path()
 
-    # The set of (addr_start, addr_end) tuples that we use to keep track of
-    # unclaimed space in the flash:
-    unclaimed_regions = set([config.memory_region_to_analyze()])
+    # The sorted list of (addr_start, addr_end) tuples that we use to keep
+    # track of unclaimed space in the flash:
+    unclaimed_regions = [config.memory_region_to_analyze()]
 
     # Using arm-none-eabi-nm, 'claim' all .text symbols by removing the regions
-    # from the unclaimed_regions set
+    # from the unclaimed_regions list
     symbols = binutils.nm_generator(elf_file, args.fast)
     bytes_claimed = 0
     for addr, section, symbol, src_path, line, size in symbols:
@@ -97,46 +105,42 @@ if (__name__ == '__main__'):
 
     # Using the resulting map of unused space,
     # calculate the total unclaimed space:
-    bytes_unclaimed = 0
-    for u in unclaimed_regions:
-        bytes_unclaimed += u[1] - u[0]
+    bytes_unclaimed = sum(u[1] - u[0] for u in unclaimed_regions)
 
     # Print out the results
     text_size = binutils.size(elf_file)[0]
     region = config.memory_region_to_analyze()
-    print "------------------------------------------------------------"
-    print ".text:                            %u" % text_size
-    print "unclaimed memory:                 %u" % bytes_unclaimed
-    print "claimed memory:                   %u" % bytes_claimed
-    print "unknown .text regions             %u" % (text_size - bytes_claimed)
-    print ""
-    print "These should add up:"
-    print "bytes_unclaimed + bytes_claimed = %u" % (bytes_unclaimed +
-                                                    bytes_claimed)
-    print "REGION_END - REGION_START =       %u" % (region[1] - region[0])
-    print ""
+    print("------------------------------------------------------------")
+    print(".text:                            %u" % text_size)
+    print("unclaimed memory:                 %u" % bytes_unclaimed)
+    print("claimed memory:                   %u" % bytes_claimed)
+    print("unknown .text regions             %u" % (text_size - bytes_claimed))
+    print("")
+    print("These should add up:")
+    print("bytes_unclaimed + bytes_claimed = %u" % (bytes_unclaimed +
+                                                     bytes_claimed))
+    print("REGION_END - REGION_START =       %u" % (region[1] - region[0]))
+    print("")
 
     num = 30
-    print "------------------------------------------------------------"
-    print "Top %u unclaimed memory regions:" % num
+    print("------------------------------------------------------------")
+    print("Top %u unclaimed memory regions:" % num)
 
-    def comparator(a, b):
-        return cmp(a[1] - a[0], b[1] - b[0])
     unclaimed_sorted_by_size = sorted(unclaimed_regions,
-                                      cmp=comparator, reverse=True)
-    for x in xrange(0, num):
+                                      key=lambda u: u[1] - u[0], reverse=True)
+    for x in range(0, num):
         region = unclaimed_sorted_by_size[x]
         size = region[1] - region[0]
         if args.dump:
-            print "-----------------------------------------------------------"
-            print "%u bytes @ 0x%08x" % (size, region[0])
-            print ""
-            print sh.arm_none_eabi_objdump('-S',
-                                           '--start-address=0x%x' % region[0],
-                                           '--stop-address=0x%x' % region[1],
-                                           elf_file)
+            print("-----------------------------------------------------------")
+            print("%u bytes @ 0x%08x" % (size, region[0]))
+            print("")
+            print(sh.arm_none_eabi_objdump('-S',
+                                            '--start-address=0x%x' % region[0],
+                                            '--stop-address=0x%x' % region[1],
+                                            elf_file))
         else:
-            print "%u bytes @ 0x%08x" % (size, region[0])
+            print("%u bytes @ 0x%08x" % (size, region[0]))
 
-    print "------------------------------------------------------------"
-    print "Unclaimed regions are regions that did map to symbols in the .elf."
+    print("------------------------------------------------------------")
+    print("Unclaimed regions are regions that did map to symbols in the .elf.")
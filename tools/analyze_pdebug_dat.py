@@ -39,59 +39,46 @@
 #
 # Columns are task name, count, total percentage, total time, average time per task
 
+# (start time, task name) pairs for each thread, in the order they were started
 tasks_by_thread = {}
 
-
-class Task(object):
-    pass
+# task name suffixes which are grouped together as a single task type
+TASK_TYPE_SUFFIXES = ('.pbi', '.png', '.apng', '.pdc', '.c')
 
 # process all lines
 with open('pdebug.dat') as f:
     import csv
     reader = csv.reader(f, delimiter=' ')
     for row in reader:
-        t = Task()
-        t.thread_id = int(row[0])
-        t.task_id = int(row[1])
-        t.start_time = float(row[2])
-        t.task_name = row[3]
+        task_name = row[3]
 
-        if t.task_name.startswith("'"):
-            t.task_name = t.task_name[1:]
-        if t.task_name.endswith("'"):
-            t.task_name = t.task_name[:-1]
+        if task_name.startswith("'"):
+            task_name = task_name[1:]
+        if task_name.endswith("'"):
+            task_name = task_name[:-1]
 
-        thread_tasks = tasks_by_thread.setdefault(t.thread_id, [])
-        thread_tasks.append(t)
+        thread_tasks = tasks_by_thread.setdefault(int(row[0]), [])
+        thread_tasks.append((float(row[2]), task_name))
 
-# assign durations
+# assign durations and total them up as [count, total duration] per task type
+stats_by_task_type = {}
 for thread_tasks in tasks_by_thread.values():
-    for i in xrange(len(thread_tasks) - 1):
-        thread_tasks[i].duration = thread_tasks[i+1].start_time - thread_tasks[i].start_time
+    durations = [next_start - start for (start, _), (next_start, _) in
+                 zip(thread_tasks, thread_tasks[1:])]
 
     # Can't guess the duration for the final task because the values only have start times :(
-    thread_tasks[-1].duration = 0
-
-# Flatten the dict into a big list
-all_tasks = [item for sublist in tasks_by_thread.values() for item in sublist]
-
-tasks_by_task_type = {}
-for t in all_tasks:
-    task_type_name = t.task_name
+    durations.append(0)
 
-    if task_type_name.endswith('.pbi'):
-        task_type_name = '.pbi'
-    elif task_type_name.endswith('.png'):
-        task_type_name = '.png'
-    elif task_type_name.endswith('.apng'):
-        task_type_name = '.apng'
-    elif task_type_name.endswith('.pdc'):
-        task_type_name = '.pdc'
-    elif task_type_name.endswith('.c'):
-        task_type_name = '.c'
+    for (_, task_name), duration in zip(thread_tasks, durations):
+        task_type_name = task_name
+        for suffix in TASK_TYPE_SUFFIXES:
+            if task_name.endswith(suffix):
+                task_type_name = suffix
+                break
 
-    task_type_tasks = tasks_by_task_type.setdefault(task_type_name, [])
-    task_type_tasks.append(t)
+        stats = stats_by_task_type.setdefault(task_type_name, [0, 0.0])
+        stats[0] += 1
+        stats[1] += duration
 
 
 class TaskType(object):
@@ -99,13 +86,13 @@ class TaskType(object):
 
 task_types = []
 total_duration = 0.0
-for task_type_name, tasks in tasks_by_task_type.items():
+for task_type_name, (count, task_type_duration) in stats_by_task_type.items():
     tt = TaskType()
 
     tt.name = task_type_name
-    tt.total_duration = reduce(lambda accumulated, x: accumulated + x.duration, tasks, 0.0)
-    tt.average_duration = tt.total_duration / len(tasks)
-    tt.count = len(tasks)
+    tt.total_duration = task_type_duration
+    tt.average_duration = tt.total_duration / count
+    tt.count = count
 
     task_types.append(tt)
 
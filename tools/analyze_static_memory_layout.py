@@ -16,7 +16,15 @@
 
 import argparse
 import re
-import sh
+import subprocess
+
+SECTION_HEADER_PATTERN = re.compile(r"""\[\s*\d+\]\s+    # Number
+                                        (\S+)\s+        # Name
+                                        \S+\s+          # Type
+                                        ([0-9a-f]+)\s+  # Virtual Address
+                                        [0-9a-f]+\s+    # Load Address
+                                        ([0-9a-f]+)\s+  # Size
+                                        """, flags=re.VERBOSE)
 
 class SectionInfo(object):
     def __init__(self, name, begin, end):
@@ -24,21 +32,24 @@ class SectionInfo(object):
         self.begin = begin
         self.end = end
 
-def read_section_info(elf_file):
-    section_headers_output = sh.arm_none_eabi_readelf('-S', elf_file)
-
-    line_pattern = re.compile(r"""\[\s*\d+\]\s+    # Number
-                                   (\S+)\s+        # Name
-                                   \S+\s+          # Type
-                                   ([0-9a-f]+)\s+  # Virtual Address
-                                   [0-9a-f]+\s+    # Load Address
-                                   ([0-9a-f]+)\s+  # Size
-                                   """, flags=re.VERBOSE)
+def command_output_lines(*args):
+    """ Runs a command and yields its output line by line as it is produced """
+    proc = subprocess.Popen(args, stdout=subprocess.PIPE, universal_newlines=True)
+    for line in proc.stdout:
+        yield line
+    proc.stdout.close()
+    if proc.wait() != 0:
+        raise subprocess.CalledProcessError(proc.returncode, args[0])
 
+def read_section_info(elf_file):
     sections = []
 
-    for line in section_headers_output:
-        match = line_pattern.search(line)
+    for line in command_output_lines('arm-none-eabi-readelf', '-S', elf_file):
+        # every section header line has its number in brackets
+        if '[' not in line:
+            continue
+
+        match = SECTION_HEADER_PATTERN.search(line)
 
         if match is None:
             continue
@@ -47,7 +58,7 @@ def read_section_info(elf_file):
         addr = int(match.group(2), 16)
         size = int(match.group(3), 16)
 
-        if (addr < 0x20000000 or addr > 0x20030000) and (addr < 0x10000000 or addr > 0x10010000):
+        if not (0x20000000 <= addr <= 0x20030000 or 0x10000000 <= addr <= 0x10010000):
             # We only care about stuff that goes into ram or CCM
             continue
 
@@ -58,25 +69,23 @@ def read_section_info(elf_file):
 
     return sections
 
-def find_symbol(word):
-    return re.compile(r"""\b({0})$""".format(word)).search
-
 def read_layout_symbols(elf_file):
-    symbols_output = sh.arm_none_eabi_objdump('-t', elf_file)
-
     desired_symbols = [ 'system_stm32f4xx.c',
                         '_heap_start',
                         '_heap_end' ]
 
-    symbols = {}
-
+    # a single pattern for all of the symbols, matching any of them at the end of a line
+    symbol_pattern = re.compile(r"""\b({0})$""".format(
+        '|'.join(re.escape(s) for s in desired_symbols)))
     line_pattern = re.compile(r"""^(\S+)""")
 
-    for line in symbols_output:
-        for s in desired_symbols:
-            if find_symbol(s)(line):
-                match = line_pattern.search(line)
-                symbols[s] = int(match.group(1), 16)
+    symbols = {}
+
+    for line in command_output_lines('arm-none-eabi-objdump', '-t', elf_file):
+        symbol_match = symbol_pattern.search(line)
+        if symbol_match:
+            match = line_pattern.search(line)
+            symbols[symbol_match.group(1)] = int(match.group(1), 16)
 
     return symbols
 
@@ -38,13 +38,17 @@ def easeIn(t):
     t /= d
     return c*t*t + b
 
+# The 33 points each table is sampled at, shared by all of the curves:
+SAMPLE_POINTS = [float(t) for t in xrange(0, 65537, 2048)]
+
 def print_table(name, func):
     nums_per_row = 4
-    table = [func(float(t)) for t in xrange(0, 65537, 2048)]
-    print "static const uint16_t %s_table[33] = {" % name
+    table = [str(int(func(t))) for t in SAMPLE_POINTS]
+    lines = ["static const uint16_t %s_table[33] = {" % name]
     for i in xrange(0, len(table), nums_per_row):
-        print '    ' + ', '.join(str(int(n)) for n in table[i:i+nums_per_row]) + ','
-    print '};\n'
+        lines.append('    ' + ', '.join(table[i:i+nums_per_row]) + ',')
+    lines.append('};\n')
+    print '\n'.join(lines)
 
 print_table('ease_in', easeIn)
 print_table('ease_out', easeOut)
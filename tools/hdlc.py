@@ -12,27 +12,45 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-try:
-    import Queue
-except ImportError:
-    # Py3 support
-    import queue as Queue
+from collections import deque
 
 HDLC_FRAME_START = 0x7e
 HDLC_ESCAPE = 0x7d
 HDLC_ESCAPE_MASK = 0x20
 
+# one-byte needles for bytearray.find(), which doesn't take an int on Python 2
+_FRAME_START_NEEDLE = bytearray([HDLC_FRAME_START])
+_ESCAPE_NEEDLE = bytearray([HDLC_ESCAPE])
+
 
 class HDLCDecoder(object):
     _STATE_SYNC, _STATE_DATA, _STATE_ESCAPE = range(3)
 
     def __init__(self):
-        self._frames = Queue.Queue()
+        self._frames = deque()
         self._state = self._STATE_SYNC
         self._buffer = bytearray()
 
     def write(self, data):
-        for b in bytearray(data):
+        if not isinstance(data, bytearray):
+            data = bytearray(data)
+        length = len(data)
+        i = 0
+        while i < length:
+            if self._state == self._STATE_DATA:
+                # copy the run of plain data bytes up to the next control byte in one go
+                end = data.find(_FRAME_START_NEEDLE, i)
+                if end == -1:
+                    end = length
+                escape = data.find(_ESCAPE_NEEDLE, i, end)
+                if escape != -1:
+                    end = escape
+                self._buffer += data[i:end]
+                i = end
+                if i == length:
+                    break
+            b = data[i]
+            i += 1
             if self._state == self._STATE_SYNC:
                 # waiting for the first FRAME_START byte
                 if b == HDLC_FRAME_START:
@@ -41,14 +59,11 @@ class HDLCDecoder(object):
                 if b == HDLC_FRAME_START:
                     # this is the end of the frame (and the start of the next one)
                     if self._buffer:
-                        self._frames.put_nowait(bytes(self._buffer))
+                        self._frames.append(bytes(self._buffer))
                     self._buffer = bytearray()
-                elif b == HDLC_ESCAPE:
+                else:
                     # escape the next byte
                     self._state = self._STATE_ESCAPE
-                else:
-                    # this a valid byte of data
-                    self._buffer.append(b)
             elif self._state == self._STATE_ESCAPE:
                 if b == HDLC_FRAME_START:
                     # invalid byte combination - drop this frame and start the next one
@@ -62,8 +77,8 @@ class HDLCDecoder(object):
 
     def get_frame(self):
         try:
-            return self._frames.get_nowait()
-        except Queue.Empty:
+            return self._frames.popleft()
+        except IndexError:
             return None
 
 
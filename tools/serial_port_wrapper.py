@@ -16,6 +16,12 @@ import serial
 import threading
 import time
 
+try:
+    basestring
+except NameError:
+    # Py3 support
+    basestring = str
+
 PEBBLE_BAUD_RATE = 230400
 SERIAL_READ_TIMEOUT = 0.1
 SERIAL_WRAPPER_READ_TIMEOUT = 0.5
@@ -41,7 +47,7 @@ class SerialPortWrapper(threading.Thread):
             if isinstance(logfile, basestring):
                 self.debug_out = open(logfile, 'wb')
                 self._close_debug = True
-            elif isinstance(logfile, file):
+            elif hasattr(logfile, 'write'):
                 self.debug_out = logfile
                 self._close_debug = False
             else:
@@ -51,7 +57,7 @@ class SerialPortWrapper(threading.Thread):
         # This signal is used to protect and signal changes in the below
         # self.data member variable
         self.signal = threading.Condition()
-        self.data = ''
+        self.data = b''
 
         self.die = False
         self.daemon = True
@@ -81,28 +87,29 @@ class SerialPortWrapper(threading.Thread):
         return rv
 
     def write_slow(self, data):
-        for c in data:
-            self.s.write(c)
+        # slice rather than index so that each write is still a byte string on Py3
+        for i in range(len(data)):
+            self.s.write(data[i:i+1])
             time.sleep(0.01)
 
     def write(self, data):
         self.write_slow(data)
 
     def readline(self, timeout=SERIAL_WRAPPER_READ_TIMEOUT):
-        result = ''
+        result = b''
 
         self.signal.acquire()
         try:
             # Try to find a newline character. If we don't have one, wait until we
             # receive more data before checking again. If we hit the timeout without
             # receiving anything just return what we have.
-            idx = self.data.find('\n')
+            idx = self.data.find(b'\n')
             while idx == -1:
                 prev_data_len = len(self.data)
 
                 self.signal.wait(timeout)
                 if (prev_data_len != len(self.data)):
-                    idx = self.data.find('\n')
+                    idx = self.data.find(b'\n')
                 else:
                     idx = len(self.data) - 1
 
@@ -134,7 +141,7 @@ class SerialPortWrapper(threading.Thread):
                 break
 
         result = self.data
-        self.data = ''
+        self.data = b''
 
         self.signal.release()
 
@@ -148,7 +155,7 @@ class SerialPortWrapper(threading.Thread):
 
     def clear(self):
         self.signal.acquire()
-        self.data = ''
+        self.data = b''
         self.signal.release()
 
     def close(self):
@@ -0,0 +1,67 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import random
+import sys
+import unittest
+
+# Allow us to run even if not at the `tools` directory.
+root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, os.path.join(root_dir, 'activity'))
+
+try:
+    import numpy as np
+    from fft import real_value_fft, real_value_fft_radix2
+except (ImportError, SyntaxError):
+    np = None
+
+
+@unittest.skipIf(np is None, "numpy is not installed or fft.py failed to import")
+class TestRealValueFFT(unittest.TestCase):
+    def assertSpectrumAlmostEqual(self, actual, expected, places=9):
+        self.assertEqual(len(actual), len(expected))
+        for i, (a, e) in enumerate(zip(actual, expected)):
+            self.assertAlmostEqual(a, e, places=places, msg='index {}: {} != {}'.format(i, a, e))
+
+    def rfft_reference(self, x):
+        """ np.fft.rfft, rearranged into [Re(0), ..., Re(N/2), Im(N/2-1), ..., Im(1)] """
+        n = len(x)
+        spectrum = np.fft.rfft(x)
+        return list(spectrum.real) + list(spectrum.imag[n // 2 - 1:0:-1])
+
+    def test_known_vector(self):
+        # X(k) = -4 + 4j * cot(k * pi / 8) for k = 1 .. 3
+        expected = [36.0, -4.0, -4.0, -4.0, -4.0,
+                    4 * (2 ** 0.5 - 1), 4.0, 4 * (2 ** 0.5 + 1)]
+        x = [1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0, 8.0]
+        self.assertSpectrumAlmostEqual(real_value_fft_radix2(list(x)), expected)
+        self.assertSpectrumAlmostEqual(real_value_fft(list(x)), expected)
+
+    def test_radix2_matches_rfft(self):
+        rng = random.Random(0)
+        for m in range(1, 11):
+            x = [rng.uniform(-1000, 1000) for _ in range(2 ** m)]
+            self.assertSpectrumAlmostEqual(real_value_fft_radix2(list(x)),
+                                           self.rfft_reference(x), places=6)
+
+    def test_non_power_of_2(self):
+        with self.assertRaises(RuntimeError):
+            real_value_fft_radix2([1.0, 2.0, 3.0])
+        with self.assertRaises(RuntimeError):
+            real_value_fft([1.0, 2.0, 3.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
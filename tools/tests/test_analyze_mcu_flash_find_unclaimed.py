@@ -0,0 +1,105 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import random
+import sys
+import unittest
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+# Allow us to run even if not at the `tools` directory.
+root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, root_dir)
+
+from analyze_mcu_flash_find_unclaimed import claim, contains
+
+
+def _claim_from_set(c, unclaimed_regions):
+    """ Reference version of claim() which searches an unordered set of unclaimed regions """
+    for u in unclaimed_regions:
+        if contains(u, c):
+            unclaimed_regions.remove(u)
+            if u[0] != c[0]:
+                unclaimed_regions.add((u[0], c[0]))
+            if u[1] != c[1]:
+                unclaimed_regions.add((c[1], u[1]))
+            return True
+    return False
+
+
+class TestClaim(unittest.TestCase):
+    def setUp(self):
+        # claim() prints a warning for regions which are already claimed
+        self.stdout = sys.stdout
+        sys.stdout = StringIO()
+
+    def tearDown(self):
+        sys.stdout = self.stdout
+
+    def test_claim_middle(self):
+        unclaimed = [(0x100, 0x200)]
+        self.assertTrue(claim((0x140, 0x180), unclaimed, 'middle'))
+        self.assertEqual(unclaimed, [(0x100, 0x140), (0x180, 0x200)])
+
+    def test_claim_edges(self):
+        unclaimed = [(0x100, 0x200)]
+        self.assertTrue(claim((0x100, 0x110), unclaimed, 'start'))
+        self.assertTrue(claim((0x1f0, 0x200), unclaimed, 'end'))
+        self.assertEqual(unclaimed, [(0x110, 0x1f0)])
+
+    def test_claim_whole_region(self):
+        unclaimed = [(0x0, 0x10), (0x20, 0x30), (0x40, 0x50)]
+        self.assertTrue(claim((0x20, 0x30), unclaimed, 'whole'))
+        self.assertEqual(unclaimed, [(0x0, 0x10), (0x40, 0x50)])
+
+    def test_doubly_claimed(self):
+        unclaimed = [(0x100, 0x200)]
+        self.assertTrue(claim((0x140, 0x180), unclaimed, 'first'))
+        self.assertFalse(claim((0x140, 0x180), unclaimed, 'second'))
+        self.assertFalse(claim((0x150, 0x160), unclaimed, 'inside'))
+        self.assertEqual(unclaimed, [(0x100, 0x140), (0x180, 0x200)])
+        self.assertIn('doubly claimed second', sys.stdout.getvalue())
+
+    def test_overlapping(self):
+        unclaimed = [(0x100, 0x140), (0x180, 0x200)]
+        # Partly claimed already, straddling both unclaimed regions, and before all of them
+        self.assertFalse(claim((0x130, 0x150), unclaimed, 'lower'))
+        self.assertFalse(claim((0x170, 0x190), unclaimed, 'upper'))
+        self.assertFalse(claim((0x120, 0x190), unclaimed, 'both'))
+        self.assertFalse(claim((0x80, 0x90), unclaimed, 'before'))
+        self.assertFalse(claim((0x1f0, 0x210), unclaimed, 'past'))
+        self.assertEqual(unclaimed, [(0x100, 0x140), (0x180, 0x200)])
+
+    def test_zero_size(self):
+        with self.assertRaises(Exception):
+            claim((0x100, 0x100), [(0x0, 0x200)], 'empty')
+
+    def test_matches_set_of_regions(self):
+        rng = random.Random(0)
+        for _ in range(50):
+            unclaimed = [(0, 10000)]
+            reference = set(unclaimed)
+            for _ in range(300):
+                start = rng.randrange(0, 9990)
+                c = (start, min(start + rng.randint(1, 60), 10000))
+                self.assertEqual(claim(c, unclaimed, 'random'), _claim_from_set(c, reference))
+                self.assertEqual(unclaimed, sorted(reference))
+
+
+if __name__ == '__main__':
+    unittest.main()
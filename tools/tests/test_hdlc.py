@@ -13,6 +13,7 @@
 # limitations under the License.
 
 import os
+import random
 import sys
 import tempfile
 import unittest
@@ -67,6 +68,72 @@ class TestHDLCDecode(unittest.TestCase):
         self.assertEquals(decoder.get_frame(), 'I am valid')
         self.assertIsNone(decoder.get_frame())
 
+    def test_escape_split_across_writes(self):
+        decoder = HDLCDecoder()
+        decoder.write(b'\x7eSplit \x7d')
+        decoder.write(b'\x5eescape\x7d')
+        decoder.write(b'\x5d')
+        decoder.write(b'\x7e')
+        self.assertEquals(decoder.get_frame(), b'Split \x7eescape\x7d')
+        self.assertIsNone(decoder.get_frame())
+
+    def test_byte_at_a_time(self):
+        decoder = HDLCDecoder()
+        data = b'\x7eOne \x7d\x5e byte\x7e\x7eat a time\x7d\x5d\x7e'
+        for i in range(len(data)):
+            decoder.write(data[i:i + 1])
+        self.assertEquals(decoder.get_frame(), b'One \x7e byte')
+        self.assertEquals(decoder.get_frame(), b'at a time\x7d')
+        self.assertIsNone(decoder.get_frame())
+
+    def test_matches_bytewise_decoder(self):
+        # The decoder copies runs of plain data bytes at once, so check it against a decoder which
+        # steps through the stream one byte at a time, on random line noise and frames that are
+        # split into random chunks
+        rng = random.Random(0)
+        alphabet = bytearray(b'\x7e\x7d\x5e\x5dab')
+        stream = bytearray()
+        for _ in range(200):
+            if rng.random() < 0.5:
+                stream += hdlc_encode_data(bytearray(rng.randrange(256)
+                                                     for _ in range(rng.randrange(64))))
+            else:
+                stream += bytearray(rng.choice(alphabet) for _ in range(rng.randrange(16)))
+
+        decoder = HDLCDecoder()
+        i = 0
+        while i < len(stream):
+            n = rng.randrange(1, 40)
+            decoder.write(bytes(stream[i:i + n]))
+            i += n
+        frames = list(iter(decoder.get_frame, None))
+        self.assertEquals(frames, _bytewise_decode(stream))
+
+
+def _bytewise_decode(data):
+    frames = []
+    frame = None
+    escape = False
+    for b in bytearray(data):
+        if frame is None:
+            if b == 0x7e:
+                frame = bytearray()
+        elif escape:
+            if b == 0x7e:
+                frame = bytearray()
+            else:
+                frame.append(b ^ 0x20)
+            escape = False
+        elif b == 0x7e:
+            if frame:
+                frames.append(bytes(frame))
+            frame = bytearray()
+        elif b == 0x7d:
+            escape = True
+        else:
+            frame.append(b)
+    return frames
+
 
 class TestHDLCEncodeData(unittest.TestCase):
     def test_simple(self):
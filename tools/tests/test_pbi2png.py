@@ -0,0 +1,117 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import random
+import sys
+import unittest
+
+# Allow us to run even if not at the `tools` directory.
+root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, root_dir)
+
+from pbi2png import argb8_to_rgba32, format_dict, pbi_struct, pbi_to_png
+
+BLACK = 0xc0
+WHITE = 0xff
+RED = 0xf0
+CLEAR = 0x00
+
+
+def _pbi(fmt, width, height, stride):
+    return pbi_struct(stride, (1 << 12) | (format_dict[fmt] << 1), 0, 0, width, height)
+
+
+def _palettized_pixels(data, width, height, stride, bitdepth):
+    """ Reference conversion which looks up the palette one pixel at a time """
+    palette = data[stride * height:]
+    pixels = []
+    for y in range(height):
+        for x in range(width):
+            bit = x * bitdepth
+            pxl8 = data[y * stride + bit // 8]
+            index = (pxl8 >> (8 - bitdepth - bit % 8)) & ((1 << bitdepth) - 1)
+            pixels.append(argb8_to_rgba32(palette[index]))
+    return pixels
+
+
+class TestPbiToPng(unittest.TestCase):
+    def setUp(self):
+        # pbi_to_png prints the format of each image it converts
+        self.stdout = sys.stdout
+        sys.stdout = open(os.devnull, 'w')
+
+    def tearDown(self):
+        sys.stdout.close()
+        sys.stdout = self.stdout
+
+    def test_8bit(self):
+        # 3 pixels wide with a stride of 4, so each row ends with a byte of padding
+        data = bytearray([BLACK, WHITE, RED, 0x55,
+                          CLEAR, RED, BLACK, 0xaa])
+        png = pbi_to_png(_pbi('GBitmapFormat8Bit', 3, 2, 4), data)
+        self.assertEqual(png.size, (3, 2))
+        self.assertEqual(list(png.getdata()),
+                         [(0, 0, 0, 255), (255, 255, 255, 255), (255, 0, 0, 255),
+                          (0, 0, 0, 0), (255, 0, 0, 255), (0, 0, 0, 255)])
+
+    def test_2bit_palette_row_padding(self):
+        # 3 pixels per row, with the padding pixel at the end of each byte set to a real index
+        data = bytearray([0x1b,  # 0, 1, 2 (3)
+                          0xe4,  # 3, 2, 1 (0)
+                          BLACK, WHITE, RED, CLEAR])
+        png = pbi_to_png(_pbi('GBitmapFormat2BitPalette', 3, 2, 1), data)
+        self.assertEqual(png.size, (3, 2))
+        self.assertEqual(list(png.getdata()),
+                         [(0, 0, 0, 255), (255, 255, 255, 255), (255, 0, 0, 255),
+                          (0, 0, 0, 0), (255, 0, 0, 255), (255, 255, 255, 255)])
+
+    def test_4bit_short_palette(self):
+        # Palettes only hold the colors that are used, so the padding nibble at the end of each row
+        # can point past the end of the palette
+        data = bytearray([0x01, 0x2f,
+                          0x21, 0x0f,
+                          RED, WHITE, BLACK])
+        png = pbi_to_png(_pbi('GBitmapFormat4BitPalette', 3, 2, 2), data)
+        self.assertEqual(list(png.getdata()),
+                         [(255, 0, 0, 255), (255, 255, 255, 255), (0, 0, 0, 255),
+                          (0, 0, 0, 255), (255, 255, 255, 255), (255, 0, 0, 255)])
+
+    def test_palettized_matches_per_pixel(self):
+        rng = random.Random(0)
+        for fmt, bitdepth in (('GBitmapFormat1BitPalette', 1),
+                              ('GBitmapFormat2BitPalette', 2),
+                              ('GBitmapFormat4BitPalette', 4)):
+            for width in (1, 3, 7, 8, 13, 33):
+                height = 5
+                stride = (width * bitdepth + 7) // 8
+                data = bytearray(rng.randrange(256) for _ in range(stride * height + 2 ** bitdepth))
+                png = pbi_to_png(_pbi(fmt, width, height, stride), bytearray(data))
+                self.assertEqual(list(png.getdata()),
+                                 _palettized_pixels(data, width, height, stride, bitdepth),
+                                 msg='{} {}px wide'.format(fmt, width))
+
+    def test_1bit(self):
+        # bits are stored least significant bit first, and rows are padded to 4 bytes
+        data = bytearray([0x05, 0x02, 0x00, 0x00,
+                          0xfa, 0x01, 0x00, 0x00])
+        png = pbi_to_png(pbi_struct(4, 0, 0, 0, 10, 2), data)
+        self.assertEqual(png.mode, '1')
+        self.assertEqual([1 if p else 0 for p in png.getdata()],
+                         [1, 0, 1, 0, 0, 0, 0, 0, 0, 1,
+                          0, 1, 0, 1, 1, 1, 1, 1, 1, 0])
+
+
+if __name__ == '__main__':
+    unittest.main()
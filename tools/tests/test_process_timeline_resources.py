@@ -0,0 +1,69 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import struct
+import sys
+import unittest
+
+# Allow us to run even if not at the `tools` directory.
+root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+repo_dir = os.path.join(root_dir, os.pardir)
+sdk_dir = os.path.join(repo_dir, 'sdk')
+sys.path.insert(0, root_dir)
+sys.path.insert(0, os.path.join(sdk_dir, 'waf'))
+sys.path.insert(0, os.path.join(sdk_dir, 'waftools'))
+sys.path.insert(0, os.path.join(sdk_dir, 'tools'))
+# pebble_sdk_version is shared with the firmware waftools, which go last so that none of their
+# modules can shadow one from tools
+sys.path.append(os.path.join(repo_dir, 'waftools'))
+
+# The SDK's waf only runs on Python 3
+try:
+    from process_timeline_resources import _serialize_timeline_lookup_table
+except SyntaxError:
+    _serialize_timeline_lookup_table = None
+
+
+def _pack_rows(rows):
+    """ Serializes a dense list of [tiny, small, large] rows one entry at a time """
+    table = b'TLUT'
+    for tiny, small, large in rows:
+        table += struct.pack('<III', tiny, small, large)
+    return table
+
+
+@unittest.skipIf(_serialize_timeline_lookup_table is None, "the SDK waftools require Python 3")
+class TestTimelineLookupTable(unittest.TestCase):
+    def test_empty(self):
+        self.assertEqual(_serialize_timeline_lookup_table({}), b'TLUT')
+
+    def test_single_entry(self):
+        self.assertEqual(_serialize_timeline_lookup_table({0: [1, 2, 3]}),
+                         b'TLUT\x01\x00\x00\x00\x02\x00\x00\x00\x03\x00\x00\x00')
+
+    def test_sparse_ids_are_zero_filled(self):
+        rows = {3: [7, 0, 9], 1: [4, 5, 6], 6: [0x10203, 0, 0]}
+        expected = _pack_rows([[0, 0, 0], [4, 5, 6], [0, 0, 0], [7, 0, 9], [0, 0, 0], [0, 0, 0],
+                               [0x10203, 0, 0]])
+        self.assertEqual(_serialize_timeline_lookup_table(rows), expected)
+
+    def test_matches_packing_each_row(self):
+        rows = {i: [i, i * 3 + 1, 0xffffffff - i] for i in range(0, 100, 3)}
+        dense = [rows.get(i, [0, 0, 0]) for i in range(max(rows) + 1)]
+        self.assertEqual(_serialize_timeline_lookup_table(rows), _pack_rows(dense))
+
+
+if __name__ == '__main__':
+    unittest.main()